@@ -1,21 +1,324 @@
-from random_env.image_collecting import RandomEnv
+from random_env.image_collecting import RandomEnv, DATASET_DIR
+from random_env.recorder import next_sample_id
+from random_env.scene_plan import ScenePlan
+from random_env.pipeline import Pipeline
+from vrep.shell import SimulatorPool, ping, read_endpoints
+import argparse
+import multiprocessing
+import queue
 import sys
+import time
+
+# Seconds before a failed worker is started again, doubled after every consecutive failure up to the maximum.
+RETRY_DELAY = 1.
+MAX_RETRY_DELAY = 60.
+# Seconds between two checks of the simulators of a pool, in the background.
+CHECK_INTERVAL = 1.
+
+
+def collect(worker_id, server_port, work, progress, args, stop):
+    """Collect the sample-id ranges of the work queue with one `RandomEnv`, until it gets `None` or `stop` is set.
+
+    With `--shard`, every range is written to its own shards, named after its first sample id; otherwise
+    the samples are written as separate files, as by a single `RandomEnv`. A range is staged until all of it
+    is written (`Recorder.start_range`), so a range collected again after a failure replaces the first attempt
+    instead of adding to it. Finished ranges are reported to `progress`.
+
+    A worker is stopped through `stop` rather than terminated, which could leave the shared queues locked:
+    it stops before its next sample, and its unfinished range is collected again. It always reports its exit,
+    even when closing the simulator connection fails.
+    """
+
+    error = None
+    env = None
+    try:
+        env = RandomEnv(server_port=server_port,
+                        scene_directory=args.scene_directory,
+                        scene_file=args.scene_file,
+                        texture_directory=args.texture_directory,
+                        texture_num=args.texture_num,
+                        version=args.version,
+                        shard_size=args.range_size if args.shard else None,
+                        render_only=args.render_only,
+                        schedule=args.schedule,
+                        time_factors=args.time_factors)
+        plans = ScenePlan.load(args.plans) if args.plans else None
+        env.reset()
+        pipeline = Pipeline(env, args.pipeline) if args.pipeline else None
+        while not stop.is_set():
+            try:
+                item = work.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            if item is None:
+                break
+            start, end = item
+            progress.put(('take', worker_id, start, end))
+            env.recorder.start_range('samples-{:09d}'.format(start))
+            t = time.time()
+            if pipeline is not None:
+                pipeline.run(end - start, None if plans is None else plans[start - args.first_id:end - args.first_id],
+                             first_id=start, cancel=stop)
+            else:
+                for sample_id in range(start, end):
+                    if stop.is_set():
+                        break
+                    env.run(None if plans is None else plans[sample_id - args.first_id], sample_id)
+            if stop.is_set():
+                break
+            env.recorder.commit_range()
+            progress.put(('range', worker_id, end - start, time.time() - t))
+        if stop.is_set():
+            error = 'stopped'
+    except Exception as e:
+        error = repr(e)
+    finally:
+        try:
+            if env is not None:
+                env.close()
+                timing = ' '.join('{}:{}/{}x(K={})'.format(factor, '-' if mean is None else '{:.4f}s'.format(mean),
+                                                            times, period)
+                                  for factor, (mean, times, period) in sorted(env.timing_report().items()))
+                print('port {} randomization timing {}'.format(server_port, timing))
+        except Exception as e:
+            if error is None:
+                error = 'closing failed: {!r}'.format(e)
+        progress.put(('exit', worker_id, error, None))
+
+
+class Orchestrator(object):
+    """Run one collecting worker per simulator port, feeding them sample-id ranges from a shared queue.
+
+    The ranges cover [first_id, first_id + target) without overlapping, `range_size` samples each, and are
+    queued a few at a time so that the collection can run without a target. The range of a worker that fails
+    is queued again, also when its process died without reporting it. With a `pool`, the simulators that die
+    or hang are restarted in the background and get a new worker; without one, a new worker starts once its
+    simulator answers a ping again and, when a pool runs elsewhere (`vrep/shell.py`), is among its endpoints.
+    A worker that keeps failing is started again later and later, and its port is given up after
+    `max_failures` failures in a row without finishing a range.
+    Every `report_every` seconds the rate of every worker and of all of them is printed.
+    """
+
+    def __init__(self, args, ports, pool=None):
+        """
+        :param args: Options of `main`.
+        :param ports: Ports of the simulators, one worker each.
+        :param pool: `vrep.shell.SimulatorPool` running the simulators, if they are managed here.
+        """
+
+        self.args = args
+        self.ports = ports
+        self.pool = pool
+        self.work = multiprocessing.Queue()
+        self.progress = multiprocessing.Queue()
+        self.next_start = args.first_id
+        self.end = None if args.target is None else args.first_id + args.target
+        self.queued = 0
+        self.samples = [0] * len(ports)
+        self.busy = [0.] * len(ports)
+        self.workers = {}
+        self.stops = {}
+        self.current = {}
+        self.failures = [0] * len(ports)
+        self.retry_at = [0.] * len(ports)
+        self.restarted = queue.Queue()
+
+    def _feed(self):
+        while self.queued < 2 * len(self.ports) and (self.end is None or self.next_start < self.end):
+            end = self.next_start + self.args.range_size
+            if self.end is not None:
+                end = min(end, self.end)
+            self.work.put((self.next_start, end))
+            self.queued += 1
+            self.next_start = end
+
+    def _spawn(self, i):
+        self.stops[i] = multiprocessing.Event()
+        worker = multiprocessing.Process(target=collect,
+                                         args=(i, self.ports[i], self.work, self.progress, self.args, self.stops[i]))
+        worker.start()
+        self.workers[i] = worker
+
+    def _lost(self, i):
+        """Queue the range of a worker again. A new worker starts once its simulator is ready, see `_ready`."""
+
+        if i in self.current:
+            self.work.put(self.current.pop(i))
+        self.failures[i] += 1
+        if self.failures[i] >= self.args.max_failures:
+            print('giving up on port {} after {} failures in a row'.format(self.ports[i], self.failures[i]),
+                  file=sys.stderr)
+            self.workers.pop(i, None)
+            if self.pool is not None:
+                self.pool.release(self.ports[i])
+            return
+        self.workers[i] = None
+        self._retry_later(i)
+
+    def _retry_later(self, i):
+        self.retry_at[i] = time.time() + min(RETRY_DELAY * 2 ** (self.failures[i] - 1), MAX_RETRY_DELAY)
+
+    def _ready(self, i):
+        """Whether the simulator of a lost worker can get a new one."""
+
+        if self.pool is not None:
+            return self.pool.is_ready(self.ports[i])
+        endpoints = read_endpoints()
+        if endpoints and self.ports[i] not in [port for _, port in endpoints]:
+            return False
+        return ping('127.0.0.1', self.ports[i])
+
+    def report(self, elapsed):
+        rates = ['{}:{:.2f}'.format(port, n / t if t > 0 else 0.)
+                 for port, n, t in zip(self.ports, self.samples, self.busy)]
+        total = sum(self.samples)
+        print('{} samples, {:.2f} samples/s [{}]'.format(total, total / elapsed, ' '.join(rates)))
+
+    def run(self):
+        for i in range(len(self.ports)):
+            self._spawn(i)
+        if self.pool is not None:
+            self.pool.start_supervisor(CHECK_INTERVAL, self.restarted)
+
+        started = time.time()
+        last_report = started
+        self._feed()
+        stopping = False
+        while self.workers:
+            if not stopping and self.end is not None and self.next_start >= self.end and self.queued == 0:
+                for i in list(self.workers):
+                    if self.workers[i] is None:
+                        del self.workers[i]
+                    else:
+                        self.work.put(None)
+                stopping = True
+                if self.pool is not None:
+                    # a restart now would fail the last ranges
+                    self.pool.stop_supervisor()
+            try:
+                kind, i, a, b = self.progress.get(timeout=1.0)
+            except queue.Empty:
+                kind = None
+            if kind == 'take':
+                self.current[i] = (a, b)
+            elif kind == 'range':
+                self.current.pop(i, None)
+                self.failures[i] = 0
+                self.samples[i] += a
+                self.busy[i] += b
+                self.queued -= 1
+                if self.pool is not None:
+                    self.pool.heartbeat(self.ports[i])
+                self._feed()
+            elif kind == 'exit' and self.workers.get(i) is not None:
+                self.workers.pop(i).join()
+                if a is not None:
+                    print('worker on port {} stopped: {}'.format(self.ports[i], a), file=sys.stderr)
+                    if not stopping:
+                        self._lost(i)
+            for i, worker in list(self.workers.items()):
+                # killed (segfault, out of memory) before it could report its exit: a worker that returned did
+                # report it. Its messages are all handled once the progress queue is empty.
+                if worker is not None and kind is None and not worker.is_alive() and worker.exitcode != 0:
+                    worker.join()
+                    del self.workers[i]
+                    print('worker on port {} died with exit code {}'.format(self.ports[i], worker.exitcode),
+                          file=sys.stderr)
+                    if not stopping:
+                        self._lost(i)
+            while not stopping:
+                try:
+                    port = self.restarted.get_nowait()
+                except queue.Empty:
+                    break
+                i = self.ports.index(port)
+                print('restarting V-Rep on port {}'.format(port), file=sys.stderr)
+                # its range is queued again once it exits
+                if self.workers.get(i) is not None:
+                    self.stops[i].set()
+            for i in [i for i, worker in self.workers.items() if worker is None]:
+                if time.time() >= self.retry_at[i]:
+                    if self._ready(i):
+                        self._spawn(i)
+                    else:
+                        self._retry_later(i)
+            if time.time() - last_report >= self.args.report_every:
+                self.report(time.time() - started)
+                last_report = time.time()
+
+        self.report(time.time() - started)
+        if not stopping:
+            print('every worker failed, the collection stopped before its target', file=sys.stderr)
+
+
+def parse_schedule(text):
+    """Parse 'texture=10,light=10' into {'texture': 10, 'light': 10}."""
+
+    schedule = {}
+    for item in text.split(','):
+        factor, period = item.split('=')
+        schedule[factor.strip()] = int(period)
+    return schedule
 
 
 def main():
-    scene_file = 'UR5_pick_env.ttt'
-    # server_port = int(sys.argv[1])
-    server_port = 19997
+    parser = argparse.ArgumentParser(description='Collect randomized images with several simulators.')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='number of simulators, one worker each; by default one per instance of the running '
+                             'simulator pool (vrep/shell.py), or 1')
+    parser.add_argument('--launch', default=None, metavar='VREP_PATH',
+                        help='start and supervise the simulators from here, with coppeliaSim.sh of VREP_PATH')
+    parser.add_argument('--hang-timeout', type=float, default=None,
+                        help='with --launch, restart a simulator whose worker finished no range for this many seconds')
+    parser.add_argument('--max-failures', type=int, default=5,
+                        help='give up on a simulator whose worker failed this many times in a row')
+    parser.add_argument('--base-port', type=int, default=19997, help='port of the first simulator, the next ones follow')
+    parser.add_argument('--target', type=int, default=None, help='number of samples to collect, endless if not set')
+    parser.add_argument('--first-id', type=int, default=None,
+                        help='sample id of the first sample, by default the one after the last sample id in the '
+                             'manifest of the dataset; a range collected again replaces the samples of its ids')
+    parser.add_argument('--range-size', type=int, default=1000,
+                        help='samples per work item, and per shard with --shard')
+    parser.add_argument('--shard', action='store_true',
+                        help='write every range to its own tar shards instead of one image and one json per sample')
+    parser.add_argument('--plans', default=None,
+                        help='pre-sampled scenes (ScenePlan.save), the first one for the sample of --first-id')
+    parser.add_argument('--report-every', type=float, default=30.0, help='seconds between rate reports')
+    parser.add_argument('--pipeline', type=int, default=0, metavar='DEPTH',
+                        help='overlap randomization, rendering and writing, with DEPTH scenes randomized ahead; '
+                             'needs pyApplyScenePlan in the scene')
+    parser.add_argument('--render-only', action='store_true',
+                        help='switch off physics and the other calculation modules, render the camera per frame only')
+    parser.add_argument('--schedule', type=parse_schedule, default=None, metavar='FACTOR=K,...',
+                        help='re-randomize these factors only every K frames, e.g. texture=10,light=10,plate=10')
+    parser.add_argument('--time-factors', action='store_true',
+                        help='time every randomization factor, at the cost of a round trip per factor')
+    parser.add_argument('--version', type=int, default=0)
+    parser.add_argument('--scene-directory', default='/home/zoker/COMP6445/Group_project/collect_data/scenes')
+    parser.add_argument('--scene-file', default='UR5_pick_env.ttt')
+    parser.add_argument('--texture-directory', default='/home/zoker/COMP6445/Group_project/collect_data/pictures_new')
+    parser.add_argument('--texture-num', type=int, default=125)
+    args = parser.parse_args()
+    if args.first_id is None:
+        args.first_id = next_sample_id(DATASET_DIR.format(args.version))
+
+    if args.launch is not None:
+        pool = SimulatorPool(args.launch, args.base_port, max(args.workers, 1), hang_timeout=args.hang_timeout)
+        pool.start()
+        try:
+            ports = [port for _, port in pool.endpoints()]
+            for port in ports:
+                pool.acquire()
+            Orchestrator(args, ports, pool).run()
+        finally:
+            pool.stop()
+        return
 
-    env = [RandomEnv(server_port=server_port,
-                       scene_directory='/home/zoker/COMP6445/Group_project/collect_data/scenes',
-                       scene_file=scene_file,
-                       texture_directory='/home/zoker/COMP6445/Group_project/collect_data/pictures_new',
-                       texture_num=125)]
-    env[0].reset()
-    while True:
-        env[0].run()
+    ports = [port for _, port in read_endpoints()]
+    if args.workers or not ports:
+        ports = [args.base_port + i for i in range(max(args.workers, 1))]
+    Orchestrator(args, ports).run()
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,47 @@
+import copy
+import numpy as np
+
+# Named settings of the camera for collection:
+#   resolution: [x, y] set on the vision sensor before collecting, `None` to keep the scene's
+#   roi: [x0, y0, x1, y1] fractions of the image kept around the plate (the camera is centered on it), `None` for all
+#   grayscale: fetch one channel instead of RGB (`options=1` of simxGetVisionSensorImage)
+CAPTURE_PROFILES = {
+    'native': {'resolution': None, 'roi': None, 'grayscale': False},
+    # rendered at the input size of `VGG`, nothing left to resize
+    'vgg': {'resolution': [224, 224], 'roi': None, 'grayscale': False},
+    # rendered larger and cropped to the plate, which fills 224x224
+    'vgg_plate': {'resolution': [320, 320], 'roi': [0.15, 0.15, 0.85, 0.85], 'grayscale': False},
+    'vgg_gray': {'resolution': [224, 224], 'roi': None, 'grayscale': True},
+}
+
+
+def get_profile(profile):
+    """Return a copy of the settings of a profile, given by name or as a dict of settings."""
+
+    if isinstance(profile, dict):
+        settings = dict(CAPTURE_PROFILES['native'])
+        settings.update(profile)
+        return copy.deepcopy(settings)
+    assert profile in CAPTURE_PROFILES, 'capture profile must be one of {}'.format(list(CAPTURE_PROFILES))
+    return copy.deepcopy(CAPTURE_PROFILES[profile])
+
+
+def crop_roi(image, roi):
+    """Crop an image to a region given as [x0, y0, x1, y1] fractions of its width and height.
+
+    The crop is a view, no pixel is copied.
+    """
+
+    if roi is None:
+        return image
+    h, w = image.shape[:2]
+    x0, y0, x1, y1 = roi
+    return image[int(round(y0 * h)):int(round(y1 * h)), int(round(x0 * w)):int(round(x1 * w))]
+
+
+def to_grayscale(image):
+    """Luminance of an RGB image, for images that were not already fetched in grayscale."""
+
+    if image.ndim == 2:
+        return image
+    return np.dot(image, np.array([0.299, 0.587, 0.114], dtype=np.float32)).astype(np.uint8)
@@ -1,10 +1,38 @@
 from vrep import vrep_env
+from vrep import sim
+import numpy as np
+import contextlib
 import random
+import time
 import os
 from collect_data.random_env.random_objects import SceneObj
 from collect_data.random_env.random_light import Light
 from collect_data.random_env.random_texture import Texture
 from collect_data.random_env.recorder import Recorder
+from collect_data.random_env.scene_plan import SceneCommands
+from collect_data.random_env.capture import get_profile, crop_roi, to_grayscale
+
+# Calculation modules a render-only collection switches off: objects are teleported, nothing has to be simulated.
+RENDER_ONLY_DISABLED = [
+    sim.sim_boolparam_dynamics_handling_enabled,
+    sim.sim_boolparam_ik_handling_enabled,
+    sim.sim_boolparam_gcs_handling_enabled,
+    sim.sim_boolparam_collision_handling_enabled,
+    sim.sim_boolparam_distance_handling_enabled,
+    sim.sim_boolparam_joint_motion_handling_enabled,
+    sim.sim_boolparam_path_motion_handling_enabled,
+    sim.sim_boolparam_proximity_sensor_handling_enabled,
+    sim.sim_boolparam_mill_handling_enabled,
+    sim.sim_boolparam_display_enabled,
+]
+
+
+# Factors of the domain randomization, in the order they are applied. A schedule re-randomizes each one
+# every K frames; between two, the factor keeps its values in the scene.
+RANDOMIZATION_FACTORS = ['camera', 'plate', 'light', 'objects', 'texture']
+
+# Dataset directory of a version, relative to the working directory.
+DATASET_DIR = 'random_dataset_V{}'
 
 
 class RandomEnv(vrep_env.VrepEnv):
@@ -17,7 +45,18 @@ class RandomEnv(vrep_env.VrepEnv):
                  scene_file=None,
                  texture_directory=None,
                  texture_num=125,
-                 version=0):
+                 version=0,
+                 scene_plan=False,
+                 texture_pool_size=None,
+                 procedural_textures=0,
+                 record_workers=2,
+                 jpeg_quality=95,
+                 shard_size=None,
+                 store_size=None,
+                 capture_profile='native',
+                 render_only=False,
+                 schedule=None,
+                 time_factors=False):
         """
 
         :param server_addr: Address which is used to connect python and V-Rep.
@@ -27,6 +66,27 @@ class RandomEnv(vrep_env.VrepEnv):
         :param texture_directory: Path of the texture files.
         :param texture_num: Amount of the texture files.
         :param version: A int value for a version mark.
+        :param scene_plan: Apply every sample with one `pyApplyScenePlan` call, which also returns the image.
+            The scene's `RemotePyApi` script must define `pyApplyScenePlan` (see `scenes/pyApplyScenePlan.lua`).
+        :param texture_pool_size: Keep up to this many textures loaded in V-Rep between samples instead of
+            loading them for every sample. Scene plans still load their own textures.
+        :param procedural_textures: Size of the ring of procedural textures mixed with the texture files,
+            0 to only use the files. Scene plans only use the files.
+        :param record_workers: Number of threads writing the samples in the background, 0 to write them in `run`.
+        :param jpeg_quality: JPEG quality of the saved images.
+        :param shard_size: Write the samples into tar shards of this many samples instead of separate files.
+        :param store_size: Also write the frames, resized to this size, to a memory-mapped tensor store
+            that `obj_detection` can train from (224 for `VGG`).
+        :param capture_profile: A name of `capture.CAPTURE_PROFILES`, or a dict of its settings: the resolution
+            set on the camera, the region of the image that is kept and whether it is fetched in grayscale.
+        :param render_only: Switch off the calculation modules (`RENDER_ONLY_DISABLED`) and render the camera
+            only when a frame is captured, with `pyRenderCamera` (see `scenes/pyRenderCamera.lua`). Start V-Rep
+            headless (`vrep/shell.py`) so that nothing else is rendered.
+        :param schedule: Re-randomize a factor of `RANDOMIZATION_FACTORS` only every K frames, given as
+            {factor: K}, e.g. {'texture': 10, 'light': 10, 'plate': 10}. Every factor changes every frame by default,
+            and all of them after `reset`. Objects that appear keep the texture they had when they were last shown.
+        :param time_factors: Time every factor of the randomization (see `timing_report`). Each factor is then
+            sent in its own batch and confirmed, which costs a round trip per factor instead of one batch a frame.
         """
 
         assert scene_directory, 'scene directoy must be provided'
@@ -35,21 +95,42 @@ class RandomEnv(vrep_env.VrepEnv):
         print('loading scene from {}'.format(scene_path))
         vrep_env.VrepEnv.__init__(self, server_addr, server_port, scene_path)
 
-        self._scene_obj = SceneObj(self.cid)
-        self._light = Light(self.cid)
-        self._texture = Texture(self.cid, texture_directory, texture_num)
+        self._scene_obj = SceneObj(self.session)
+        self._light = Light(self.session)
+        self._texture = Texture(self.session, texture_directory, texture_num, texture_pool_size,
+                                procedural_textures)
 
         self.handle_vision = self.get_object_handle('Camera')
+        self.capture = get_profile(capture_profile)
+        if self.capture['resolution'] is not None:
+            self.obj_set_vision_resolution(self.handle_vision, self.capture['resolution'])
 
-        self.recorder = Recorder('random_dataset_V' + str(version))
+        self.recorder = Recorder(DATASET_DIR.format(version), workers=record_workers, quality=jpeg_quality,
+                                 shard_size=shard_size, store_size=store_size)
 
+        self.version = version
+        self.scene_plan = scene_plan
+        self.render_only = render_only
         self.step_num = 0
+        self.sample_id = None
         self.target_pos = []
 
         self.camera_pos = []
         self.camera_ori = []
         self.image = None
 
+        self.schedule = dict((factor, 1) for factor in RANDOMIZATION_FACTORS)
+        if schedule is not None:
+            assert set(schedule) <= set(RANDOMIZATION_FACTORS), \
+                'schedule factors must be in {}'.format(RANDOMIZATION_FACTORS)
+            self.schedule.update(schedule)
+        # frames randomized since `reset`, and the current values of the factors, owned by `_randomize`
+        self.frame_num = 0
+        self.randomized = {'camera_pos': [], 'camera_ori': [], 'target_pos': [], 'chosen_obj_id': []}
+        # factor -> [seconds, times], see `timing_report`
+        self.time_factors = time_factors
+        self.timing = dict((factor, [0., 0]) for factor in RANDOMIZATION_FACTORS + ['capture'])
+
     def _multi_step(self, nstep=5):
         """Simulate every once in a while in V-Rep.
 
@@ -62,23 +143,211 @@ class RandomEnv(vrep_env.VrepEnv):
         for i in range(nstep):
             self.step_simulation()
 
-    def run(self):
-        """Run the collecting program. Domain randomization and collecting process."""
+    def run(self, sample=None, sample_id=None):
+        """Run the collecting program. Domain randomization and collecting process.
 
-        self.step_num += 1
-        self.camera_pos, self.camera_ori = self._scene_obj.random_camera()
-        self._scene_obj.random_plate()
-        self._light.random_light()
+        :param sample: A pre-sampled scene, one row of `scene_plan.ScenePlan.sample`. It is applied with
+            one `pyApplyScenePlan` call. The scene is randomized here when it is `None`.
+        :param sample_id: Id of the sample in the collection, saved in its record.
+        :type sample: numpy structured array.
+              sample_id: int value.
+        """
 
-        self._scene_obj.init_multi_obj()
-        self.target_pos, chosen_obj_id = self._scene_obj.random_obj()
+        self.step_num += 1
+        self.sample_id = sample_id
+        if sample is not None:
+            self._run_sample(sample)
+            self._recoder()
+            return
+        if self.scene_plan:
+            self._run_plan()
+            self._recoder()
+            return
 
-        self._texture.random_texture(['plate', 'plane', 'table', 'tar_objs'], tar_objs_id=chosen_obj_id)
-        self._texture.delete_texture()
+        self.camera_pos, self.camera_ori, self.target_pos = self._randomize()
 
-        self.image = self.obj_get_vision_image(self.handle_vision)
+        with self._timed('capture'):
+            self.image = self.capture_image()
         self._recoder()
 
+    def _due(self, factor):
+        return (self.frame_num - 1) % self.schedule[factor] == 0
+
+    @contextlib.contextmanager
+    def _timed(self, factor):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.timing[factor][0] += time.time() - start
+            self.timing[factor][1] += 1
+
+    @contextlib.contextmanager
+    def _factor(self, factor, target):
+        """Randomize a factor inside the block. With `time_factors`, it is sent in its own batch and timed
+        until V-Rep confirms it was applied; otherwise it is only counted and joins the batch of the frame."""
+
+        if not self.time_factors:
+            self.timing[factor][1] += 1
+            yield
+            return
+        with self._timed(factor), target.batch(confirm=True):
+            yield
+
+    def _randomize(self, plan=None):
+        """Re-randomize the factors that are due this frame, in V-Rep or into a plan.
+
+        :param plan: Record the changes into this plan instead of sending them to V-Rep.
+        :type plan: scene_plan.SceneCommands.
+        :return: camera_pos, camera_ori, target_pos
+
+        The setters of all the factors but the texture are sent in one batch, unless the factors are timed.
+        """
+
+        self.frame_num += 1
+        state = self.randomized
+        target = self if plan is None else plan
+        # a batch flushes at its outermost level only, so timed factors must not be nested in the frame's
+        with contextlib.nullcontext() if self.time_factors else target.batch():
+            if self._due('camera'):
+                with self._factor('camera', target):
+                    state['camera_pos'], state['camera_ori'] = self._scene_obj.random_camera(plan)
+            if self._due('plate'):
+                with self._factor('plate', target):
+                    self._scene_obj.random_plate(plan)
+            if self._due('light'):
+                with self._factor('light', target):
+                    self._light.random_light(plan)
+            if self._due('objects'):
+                with self._factor('objects', target):
+                    self._scene_obj.init_multi_obj(plan)
+                    state['target_pos'], state['chosen_obj_id'] = self._scene_obj.random_obj(plan)
+
+        if self._due('texture'):
+            with self._factor('texture', target):
+                self._texture.random_texture(['plate', 'plane', 'table', 'tar_objs'],
+                                             tar_objs_id=state['chosen_obj_id'], plan=plan)
+                if plan is None:
+                    self._texture.delete_texture()
+        return state['camera_pos'], state['camera_ori'], state['target_pos']
+
+    def timing_report(self):
+        """Cost of every factor of the randomization, and of the image capture.
+
+        :return: report
+
+        `report` maps every factor to (mean seconds per randomization, number of randomizations, period K).
+        The mean is `None` for the factors of the randomization unless `time_factors` is set; the capture is
+        always timed, but without `time_factors` its time includes applying the batch of the frame.
+        """
+
+        report = {}
+        for factor, (seconds, times) in self.timing.items():
+            mean = seconds / times if times else 0.
+            if factor in RANDOMIZATION_FACTORS and not self.time_factors:
+                mean = None
+            report[factor] = (mean, times, self.schedule.get(factor, 1))
+        return report
+
+    def make_plan(self, sample=None):
+        """Randomize a scene into a plan, without talking to V-Rep once the object handles are cached.
+
+        :param sample: A pre-sampled scene, one row of `scene_plan.ScenePlan.sample`. The scene is randomized
+            here when it is `None`.
+        :type sample: numpy structured array.
+        :return: plan, camera_pos, camera_ori, target_pos
+        """
+
+        plan = SceneCommands()
+        if sample is not None:
+            camera_pos, camera_ori, target_pos, chosen_obj_id = self._scene_obj.plan_sample(sample, plan)
+            self._light.plan_sample(sample, plan)
+            self._texture.plan_sample(sample, chosen_obj_id, plan)
+            return plan, camera_pos, camera_ori, target_pos
+
+        camera_pos, camera_ori, target_pos = self._randomize(plan)
+        return plan, camera_pos, camera_ori, target_pos
+
+    def cache_plan_handles(self):
+        """Resolve every handle `make_plan` looks up, so that it can run in another thread than V-Rep's calls."""
+
+        for name in self._scene_obj.obj_names:
+            self.get_object_handle(name + '_texture0')
+
+    def render_plan(self, item):
+        """Apply a scene made by `make_plan` and capture its image in one round trip.
+
+        :param item: What `make_plan` returned.
+        :type item: tuple.
+        """
+
+        plan, self.camera_pos, self.camera_ori, self.target_pos = item
+        self.image = self._apply_capture(self.apply_plan(plan))
+
+    def _run_plan(self):
+        """Randomize the scene in Python, then apply it and capture the image in one round trip."""
+
+        self.render_plan(self.make_plan())
+
+    def _run_sample(self, sample):
+        """Apply a pre-sampled scene and capture the image in one round trip."""
+
+        self.render_plan(self.make_plan(sample))
+
+    def capture_image(self):
+        """Fetch the camera image as set by the capture profile."""
+
+        if self.render_only:
+            return self._apply_capture(self.render_camera())
+        return self._apply_capture(self.obj_get_vision_image(self.handle_vision, self.capture['grayscale']))
+
+    def render_camera(self):
+        """Render the camera now and return its image, (H, W, 3), `None` if the call failed."""
+
+        inData = [[self.handle_vision], [], [], bytearray()]
+        ret, ints, _, _, buffer = self.call_childscript_function_arrays('RemotePyApi', 'pyRenderCamera', inData)
+        return self._decode_image(ret, ints, buffer)
+
+    def _decode_image(self, ret, ints, buffer):
+        if ret != 0:
+            return None
+        image = np.frombuffer(buffer, dtype=np.uint8).reshape((ints[1], ints[0], 3))
+        return image[::-1]
+
+    def set_render_only(self, enabled=True):
+        """Switch the calculation modules of `RENDER_ONLY_DISABLED` off, or back on.
+
+        The camera is then only rendered on request: explicitly handled, with `pySetExplicitHandling`.
+        """
+
+        with self.batch():
+            for param in RENDER_ONLY_DISABLED:
+                self.set_boolean_parameter(param, not enabled)
+        inData = [[self.handle_vision, int(enabled)], [], [], bytearray()]
+        self.call_childscript_function('RemotePyApi', 'pySetExplicitHandling', inData)
+
+    def _apply_capture(self, image):
+        if image is None:
+            return None
+        image = crop_roi(image, self.capture['roi'])
+        if self.capture['grayscale']:
+            image = to_grayscale(image)
+        return image
+
+    def apply_plan(self, plan):
+        """Apply a scene plan in V-Rep and return the image rendered by the camera afterwards.
+
+        :param plan: The changes of one sample.
+        :type plan: scene_plan.SceneCommands.
+        :return: image
+
+        `image` is a numpy array of shape (H, W, 3), `None` if the call failed.
+        """
+
+        inData = [[self.handle_vision], [], plan.strings, plan.pack()]
+        ret, ints, _, _, buffer = self.call_childscript_function_arrays('RemotePyApi', 'pyApplyScenePlan', inData)
+        return self._decode_image(ret, ints, buffer)
+
     def reset(self):
         """Reset V-Rep"""
 
@@ -86,8 +355,18 @@ class RandomEnv(vrep_env.VrepEnv):
             self.stop_simulation()
         self.start_simulation()
         self.step_num = 0
+        self.frame_num = 0
+        if self.render_only:
+            # child script functions are only callable while the simulation runs
+            self.set_render_only()
+            return
         self._multi_step()
 
+    def close(self):
+        """Wait until every collected sample is written."""
+
+        self.recorder.close()
+
     def seed(self, seed=None):
         """Random seed.
 
@@ -100,6 +379,6 @@ class RandomEnv(vrep_env.VrepEnv):
     def _recoder(self):
         """Record data to make tf-record."""
 
-        record = {'step_num': self.step_num, 'image': self.image, 'camera_ori': self.camera_ori,
-                  'camera_pos': self.camera_pos, 'target_location': self.target_pos}
+        record = {'version': self.version, 'step_num': self.step_num, 'image': self.image, 'camera_ori': self.camera_ori,
+                  'camera_pos': self.camera_pos, 'target_location': self.target_pos, 'sample_id': self.sample_id}
         self.recorder.add_record(record)
@@ -0,0 +1,100 @@
+import queue
+import threading
+import time
+
+_DONE = object()
+
+
+class Pipeline(object):
+    """Collect samples with a `RandomEnv` in three overlapping stages.
+
+    1. A thread randomizes the next samples into scene plans (`RandomEnv.make_plan`), up to `depth` ahead.
+    2. The calling thread applies each plan and gets the rendered image back in one `pyApplyScenePlan` call;
+       ctypes releases the GIL while it waits for V-Rep, so the next plan is built meanwhile.
+    3. The writer threads of the env's `Recorder` encode and write the previous samples.
+
+    Throughput is set by the slowest stage instead of their sum. Only the calling thread talks to V-Rep:
+    the scene must define `pyApplyScenePlan` (see `scenes/pyApplyScenePlan.lua`).
+    """
+
+    def __init__(self, env, depth=2):
+        """
+        :param env: The collecting environment, reset.
+        :param depth: Number of plans built ahead of the one being rendered.
+        :type env: image_collecting.RandomEnv.
+              depth: int value.
+        """
+
+        self.env = env
+        self.depth = depth
+        # seconds spent in every stage, and waiting for the next plan
+        self.timing = {'plan': 0., 'render': 0., 'record': 0., 'wait': 0.}
+        self.count = 0
+        env.cache_plan_handles()
+
+    def _produce(self, plans, samples, num, stop):
+        try:
+            for i in range(num):
+                if stop.is_set():
+                    break
+                t = time.time()
+                item = self.env.make_plan(None if samples is None else samples[i])
+                self.timing['plan'] += time.time() - t
+                plans.put(item)
+        except Exception as e:
+            plans.put(e)
+        plans.put(_DONE)
+
+    def run(self, num=None, samples=None, first_id=None, cancel=None):
+        """Collect `num` samples, or one per pre-sampled scene of `samples`.
+
+        :param num: Number of samples, `len(samples)` when `None`.
+        :param samples: Pre-sampled scenes, rows of `scene_plan.ScenePlan.sample`, randomized here when `None`.
+        :param first_id: Sample id of the first sample, the next ones follow. No id is recorded when `None`.
+        :param cancel: An event that stops the run before the next sample once it is set.
+        :return: The number of samples collected.
+        """
+
+        if num is None:
+            num = len(samples)
+        plans = queue.Queue(maxsize=self.depth)
+        stop = threading.Event()
+        producer = threading.Thread(target=self._produce, args=(plans, samples, num, stop), daemon=True)
+        producer.start()
+        env = self.env
+        collected = 0
+        try:
+            while cancel is None or not cancel.is_set():
+                t = time.time()
+                item = plans.get()
+                self.timing['wait'] += time.time() - t
+                if item is _DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                t = time.time()
+                env.step_num += 1
+                env.sample_id = None if first_id is None else first_id + collected
+                env.render_plan(item)
+                self.timing['render'] += time.time() - t
+
+                t = time.time()
+                env._recoder()
+                self.timing['record'] += time.time() - t
+                collected += 1
+        finally:
+            # let the producer finish if the collection stopped early
+            stop.set()
+            while producer.is_alive():
+                try:
+                    plans.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+        self.count += collected
+        return collected
+
+    def report(self):
+        """Seconds per sample of every stage."""
+
+        count = max(self.count, 1)
+        return {stage: seconds / count for stage, seconds in self.timing.items()}
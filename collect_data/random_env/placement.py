@@ -0,0 +1,93 @@
+import numpy as np
+
+# Bounds of the 3x3 blocks the work area of the plate is divided into, along x and along y.
+BLOCK_BOUNDS = [-0.2, -0.07, 0.07, 0.2]
+
+
+def block_bounds(blocks, bounds_x=BLOCK_BOUNDS, bounds_y=BLOCK_BOUNDS):
+    """Return the lower and upper [x, y] corners of blocks.
+
+    :param blocks: Block ids, numbered row by row along x.
+    :type blocks: numpy array of int.
+    :return: low, high
+
+    `low` and `high` have the shape of `blocks` plus a last axis of length 2.
+    """
+
+    bounds_x = np.asarray(bounds_x)
+    bounds_y = np.asarray(bounds_y)
+    cols = len(bounds_x) - 1
+    r = blocks % cols
+    c = blocks // cols
+    low = np.stack([bounds_x[r], bounds_y[c]], axis=-1)
+    high = np.stack([bounds_x[r + 1], bounds_y[c + 1]], axis=-1)
+    return low, high
+
+
+def sample_positions(blocks, on=None, threshold=0.04, rng=None,
+                     bounds_x=BLOCK_BOUNDS, bounds_y=BLOCK_BOUNDS, max_rounds=1000):
+    """Sample a position inside its block for every object of many scenes, keeping objects apart.
+
+    :param blocks: Block id of every object, shape (scenes, objects).
+    :param on: Which objects are placed, shape (scenes, objects). All of them when `None`.
+    :param threshold: Minimum distance between two placed objects of a scene.
+    :param rng: numpy random Generator. A new one is created when `None`.
+    :param max_rounds: Maximum number of resampling rounds.
+    :return: xy
+
+    `xy` has shape (scenes, objects, 2). Every round, each placed object that is too close to a placed
+    object before it is resampled in its block, for all scenes at once; the others keep their position.
+    Blocks may be shared by several objects, as long as they are large enough to hold them.
+    """
+
+    if rng is None:
+        rng = np.random.default_rng()
+    blocks = np.asarray(blocks)
+    if on is None:
+        on = np.ones(blocks.shape, dtype=bool)
+    low, high = block_bounds(blocks, bounds_x, bounds_y)
+    xy = rng.uniform(low, high)
+
+    earlier = np.tril(np.ones((blocks.shape[1], blocks.shape[1]), dtype=bool), -1)
+    pairs = on[:, :, None] & on[:, None, :] & earlier
+    active = np.arange(len(blocks))
+    for _ in range(max_rounds):
+        sub = xy[active]
+        dist = np.linalg.norm(sub[:, :, None] - sub[:, None, :], axis=3)
+        bad = ((dist < threshold) & pairs[active]).any(axis=2)
+        keep = bad.any(axis=1)
+        if not keep.any():
+            return xy
+        active, bad = active[keep], bad[keep]
+        sub = xy[active]
+        sub[bad] = rng.uniform(low[active][bad], high[active][bad])
+        xy[active] = sub
+    raise RuntimeError('Could not place the objects {} apart in {} rounds.'.format(threshold, max_rounds))
+
+
+def sample_layouts(scene_num, obj_num, threshold=0.04, rng=None,
+                   bounds_x=BLOCK_BOUNDS, bounds_y=BLOCK_BOUNDS, min_objs=1):
+    """Choose the objects, their blocks and their positions for many scenes at once.
+
+    :param scene_num: Number of scenes.
+    :param obj_num: Number of objects in a scene.
+    :param min_objs: Minimum number of chosen objects in a scene.
+    :param rng: numpy random Generator. A new one is created when `None`.
+    :return: on, blocks, xy
+
+    `on` (scene_num, obj_num) marks the chosen objects; between `min_objs` and `obj_num` of them, uniformly.
+    `blocks` (scene_num, obj_num) are distinct blocks while there are enough of them, -1 for objects not chosen.
+    `xy` (scene_num, obj_num, 2) are the positions of the objects on the plate.
+    """
+
+    if rng is None:
+        rng = np.random.default_rng()
+    block_num = (len(bounds_x) - 1) * (len(bounds_y) - 1)
+    count = rng.integers(min_objs, obj_num + 1, size=scene_num)
+    order = np.argsort(rng.random((scene_num, obj_num)), axis=1)
+    on = np.zeros((scene_num, obj_num), dtype=bool)
+    np.put_along_axis(on, order, np.arange(obj_num) < count[:, None], axis=1)
+
+    blocks = np.argsort(rng.random((scene_num, max(block_num, obj_num))), axis=1)[:, :obj_num] % block_num
+    xy = sample_positions(blocks, on, threshold, rng, bounds_x, bounds_y)
+    return on, np.where(on, blocks, -1), xy
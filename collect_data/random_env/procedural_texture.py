@@ -0,0 +1,140 @@
+import numpy as np
+
+
+def _colors(rng, n):
+    return rng.uniform(0, 255, size=(n, 3))
+
+
+def _blend(t, colors):
+    """Map a field `t` in [0, 1] of shape (H, W) to an RGB image between two colors."""
+
+    t = t[:, :, None]
+    return colors[0] * (1 - t) + colors[1] * t
+
+
+def _coordinates(resolution):
+    y, x = np.mgrid[0:resolution[1], 0:resolution[0]].astype(np.float32)
+    return x / resolution[0], y / resolution[1]
+
+
+def noise(rng, resolution):
+    """Value noise: a few octaves of random grids, upsampled bilinearly, between two colors."""
+
+    w, h = resolution
+    field = np.zeros((h, w), dtype=np.float32)
+    weight = 1.0
+    total = 0.0
+    cells = rng.integers(2, 9)
+    for _ in range(rng.integers(1, 5)):
+        grid = rng.random((cells + 1, cells + 1))
+        gx = np.linspace(0, cells, w, endpoint=False)
+        gy = np.linspace(0, cells, h, endpoint=False)
+        x0, y0 = gx.astype(int), gy.astype(int)
+        fx, fy = (gx - x0)[None, :], (gy - y0)[:, None]
+        top = grid[y0][:, x0] * (1 - fx) + grid[y0][:, x0 + 1] * fx
+        bottom = grid[y0 + 1][:, x0] * (1 - fx) + grid[y0 + 1][:, x0 + 1] * fx
+        field += weight * (top * (1 - fy) + bottom * fy)
+        total += weight
+        weight *= 0.5
+        cells *= 2
+    return _blend(field / total, _colors(rng, 2))
+
+
+def stripes(rng, resolution):
+    """Parallel stripes of random direction, frequency and sharpness between two colors."""
+
+    x, y = _coordinates(resolution)
+    angle = rng.uniform(0, np.pi)
+    frequency = rng.uniform(2, 32)
+    wave = np.sin(2 * np.pi * frequency * (x * np.cos(angle) + y * np.sin(angle)))
+    if rng.random() < 0.5:
+        t = (wave > 0).astype(np.float32)
+    else:
+        t = (wave + 1) / 2
+    return _blend(t, _colors(rng, 2))
+
+
+def checkerboard(rng, resolution):
+    """A checkerboard of random cell size and rotation between two colors."""
+
+    x, y = _coordinates(resolution)
+    angle = rng.uniform(0, np.pi / 2)
+    cells = rng.uniform(2, 24)
+    u = x * np.cos(angle) - y * np.sin(angle)
+    v = x * np.sin(angle) + y * np.cos(angle)
+    t = (np.floor(u * cells) + np.floor(v * cells)) % 2
+    return _blend(t.astype(np.float32), _colors(rng, 2))
+
+
+def color_field(rng, resolution):
+    """A uniform color, or a linear gradient between two colors."""
+
+    colors = _colors(rng, 2)
+    if rng.random() < 0.5:
+        colors[1] = colors[0]
+    x, y = _coordinates(resolution)
+    angle = rng.uniform(0, 2 * np.pi)
+    t = x * np.cos(angle) + y * np.sin(angle)
+    t = (t - t.min()) / max(t.max() - t.min(), 1e-6)
+    return _blend(t, colors)
+
+
+GENERATORS = {'noise': noise, 'stripes': stripes, 'checkerboard': checkerboard, 'color_field': color_field}
+
+
+def generate(rng, resolution=(256, 256), kind=None):
+    """Generate one texture.
+
+    :param rng: numpy random Generator.
+    :param resolution: Width and height of the texture.
+    :param kind: A key of `GENERATORS`, drawn at random when `None`.
+    :return: texture
+
+    `texture` is a contiguous uint8 numpy array of shape (height, width, 3), ready for `pyCreateTextureFromBuffer`.
+    """
+
+    if kind is None:
+        kind = list(GENERATORS)[rng.integers(len(GENERATORS))]
+    texture = GENERATORS[kind](rng, resolution)
+    return np.ascontiguousarray(np.clip(texture, 0, 255).astype(np.uint8))
+
+
+class TextureRing(object):
+    """A ring of pre-generated procedural textures.
+
+    `next` returns the textures in turn and regenerates one of them every `refresh` calls, oldest first,
+    so a texture costs 1/`refresh` of a generation per use and the ring keeps changing.
+    """
+
+    def __init__(self, size=16, resolution=(256, 256), kinds=None, refresh=4, seed=None):
+        """
+        :param size: Number of textures in the ring.
+        :param resolution: Width and height of the textures.
+        :param kinds: Keys of `GENERATORS` to draw from, all of them when `None`.
+        :param refresh: Number of `next` calls per regenerated texture, 0 to keep the ring fixed.
+        :param seed: Seed of the random generator.
+        """
+
+        self.resolution = tuple(resolution)
+        self.kinds = list(kinds) if kinds is not None else list(GENERATORS)
+        self.refresh = refresh
+        self.rng = np.random.default_rng(seed)
+        self.textures = [self._generate() for _ in range(size)]
+        self.index = 0
+        self.oldest = 0
+        self.uses = 0
+
+    def _generate(self):
+        return generate(self.rng, self.resolution, self.kinds[self.rng.integers(len(self.kinds))])
+
+    def next(self):
+        """Return the next texture of the ring."""
+
+        texture = self.textures[self.index]
+        self.index = (self.index + 1) % len(self.textures)
+        if self.refresh:
+            self.uses += 1
+            if self.uses % self.refresh == 0:
+                self.textures[self.oldest] = self._generate()
+                self.oldest = (self.oldest + 1) % len(self.textures)
+        return texture
@@ -6,13 +6,13 @@ import random
 class Light(vrep_env.VrepEnv):
     """Randomly set light in V-Rep environment."""
 
-    def __init__(self, cid):
+    def __init__(self, session):
         """
-        :param cid: Remote V_Rep simulation window's id.
-        :type cid: int value.
+        :param session: Connection to V-Rep shared with the other components.
+        :type session: vrep_env.SimSession.
         """
 
-        vrep_env.VrepEnv.__init__(self, cid=cid)
+        vrep_env.VrepEnv.__init__(self, session=session)
 
         self.dirlt_num = 4
         self.spotlt_num = 4
@@ -32,13 +32,17 @@ class Light(vrep_env.VrepEnv):
         self.handle_spotlt = list(map(self.get_object_handle, spotlt_names))
         self.handle_omnidirlt = list(map(self.get_object_handle, omnidirlt_names))
 
-    def random_light(self):
-        """Set light in V-Rep randomly."""
+    def random_light(self, plan=None):
+        """Set light in V-Rep randomly.
 
-        self._turnOfflights()
+        :param plan: Record the changes into this plan instead of sending them to V-Rep.
+        :type plan: scene_plan.SceneCommands.
+        """
+
+        self._turnOfflights(plan)
         self._random_lighton()
-        self._random_lightpos()
-        self._turnOnlights()
+        self._random_lightpos(plan=plan)
+        self._turnOnlights(plan=plan)
 
     def default_light(self):
         """Restore to default light in V-Rep."""
@@ -48,9 +52,17 @@ class Light(vrep_env.VrepEnv):
         self._random_lightpos(original=True)
         self._turnOnlights(original=True)
 
-    def _turnOfflights(self):
-        """Turn off all lights in V-Rep."""
+    def _turnOfflights(self, plan=None):
+        """Turn off all lights in V-Rep.
+
+        :param plan: Record the changes into this plan instead of sending them to V-Rep.
+        :type plan: scene_plan.SceneCommands.
+        """
 
+        if plan is not None:
+            for light in self.handle_dirlt + self.handle_spotlt + self.handle_omnidirlt:
+                plan.set_light(light, False)
+            return
         inInts = [0]
         for light in self.handle_dirlt + self.handle_spotlt + self.handle_omnidirlt:
             inInts.append(light)
@@ -60,11 +72,13 @@ class Light(vrep_env.VrepEnv):
         inData = [inInts, inFloats, inStrings, emptyBuff]
         self.call_childscript_function('RemotePyApi', 'pySetLights', inData)
 
-    def _turnOnlights(self, original=False):
+    def _turnOnlights(self, original=False, plan=None):
         """Turn on chosen lights in V-Rep randomly.
 
         :param original: Use default light in V-Rep or not.
+               plan: Record the changes into this plan instead of sending them to V-Rep.
         :type original: bool
+              plan: scene_plan.SceneCommands.
 
         The type of `original` is bool. `original` is `True` when use default light in V-Rep, `False` otherwise.
         """
@@ -84,6 +98,10 @@ class Light(vrep_env.VrepEnv):
             for i in range(len(inInts)-1):
                 for j in range(3):
                     inFloats.append(np.random.uniform(0.0, 1.0))
+        if plan is not None:
+            for i, light in enumerate(inInts[1:]):
+                plan.set_light(light, True, inFloats[3 * i:3 * i + 3])
+            return
         inStrings = []
         emptyBuff = bytearray()
         inData = [inInts, inFloats, inStrings, emptyBuff]
@@ -105,36 +123,60 @@ class Light(vrep_env.VrepEnv):
             self.handle_omnidirlton.append(self.handle_omnidirlt[random.randint(0, self.omnidirlt_num-1)])
         # print('omnidirectional light: ', len(self.handle_omnidirlton))
 
-    def _random_lightpos(self, original=False):
+    def _random_lightpos(self, original=False, plan=None):
         """Set the position and direction of the lights in V-Rep randomly .
 
         :param original: Use default light position in V-Rep or not.
+               plan: Record the changes into this plan instead of sending them to V-Rep.
         :type original: bool
+              plan: scene_plan.SceneCommands.
 
         The type of `original` is bool. `original` is `True` when use default light position in V-Rep, `False` otherwise.
         """
 
         if original:
             return
-        # random orientation for directional lights
-        dir_pos = []
-        for lt in self.handle_dirlton:
-            dirlt_oris = np.random.randint(-180, 180, size=3)
-            dir_pos.append(list(dirlt_oris))
-            self.obj_set_orientation(lt, dirlt_oris)
-        # random position and orientation for spot lights
-        spot_pos = []
-        for lt in self.handle_spotlton:
-            x = y = random.uniform(-2.5, 2.5)
-            z = random.uniform(0, 5.0)
-            spotlt_oris = np.random.randint(-180, 180, size=3)
-            spot_pos.append([[x,y,z], list(spotlt_oris)])
-            self.obj_set_orientation(lt, spotlt_oris)
-            self.obj_set_position(lt, [x, y, z])
-        # random position for omnidirectional lights
-        omni_pos = []
-        for lt in self.handle_omnidirlton:
-            x = y = random.uniform(-2.5, 2.5)
-            z = random.uniform(0, 5.0)
-            omni_pos.append([x, y, z])
-            self.obj_set_position(lt, [x, y, z])
+        target = self if plan is None else plan
+        with target.batch():
+            # random orientation for directional lights
+            dir_pos = []
+            for lt in self.handle_dirlton:
+                dirlt_oris = np.random.randint(-180, 180, size=3)
+                dir_pos.append(list(dirlt_oris))
+                target.obj_set_orientation(lt, dirlt_oris)
+            # random position and orientation for spot lights
+            spot_pos = []
+            for lt in self.handle_spotlton:
+                x = y = random.uniform(-2.5, 2.5)
+                z = random.uniform(0, 5.0)
+                spotlt_oris = np.random.randint(-180, 180, size=3)
+                spot_pos.append([[x,y,z], list(spotlt_oris)])
+                target.obj_set_orientation(lt, spotlt_oris)
+                target.obj_set_position(lt, [x, y, z])
+            # random position for omnidirectional lights
+            omni_pos = []
+            for lt in self.handle_omnidirlton:
+                x = y = random.uniform(-2.5, 2.5)
+                z = random.uniform(0, 5.0)
+                omni_pos.append([x, y, z])
+                target.obj_set_position(lt, [x, y, z])
+
+    def plan_sample(self, sample, plan):
+        """Record the lights of a pre-sampled scene into a plan.
+
+        :param sample: One row of `scene_plan.ScenePlan.sample`.
+               plan: The plan of the sample.
+        :type sample: numpy structured array.
+              plan: scene_plan.SceneCommands.
+        """
+
+        handles = self.handle_dirlt + self.handle_spotlt + self.handle_omnidirlt
+        self._turnOfflights(plan)
+        for i in np.flatnonzero(sample['light_on']):
+            handle = handles[i]
+            if handle in self.handle_dirlt or handle in self.handle_spotlt:
+                plan.obj_set_orientation(handle, [float(v) for v in sample['light_ori'][i]])
+            if handle in self.handle_spotlt or handle in self.handle_omnidirlt:
+                plan.obj_set_position(handle, [float(v) for v in sample['light_pos'][i]])
+        for i in np.flatnonzero(sample['light_on']):
+            plan.set_light(handles[i], True, [float(v) for v in sample['light_rgb'][i]])
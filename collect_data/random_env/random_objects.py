@@ -1,4 +1,5 @@
 from vrep import vrep_env
+from collect_data.random_env import placement
 import numpy as np
 import random
 import math
@@ -7,13 +8,13 @@ import math
 class SceneObj(vrep_env.VrepEnv):
     """Randomly set scene objects in V-Rep environment."""
 
-    def __init__(self, cid):
+    def __init__(self, session):
         """
-        :param cid: Remote V_Rep simulation window's id.
-        :type cid: int value.
+        :param session: Connection to V-Rep shared with the other components.
+        :type session: vrep_env.SimSession.
         """
 
-        vrep_env.VrepEnv.__init__(self, cid=cid)
+        vrep_env.VrepEnv.__init__(self, session=session)
 
         self.handle_UR5 = self.get_object_handle('UR5')
         self.handle_camera = self.get_object_handle('Camera')
@@ -27,75 +28,57 @@ class SceneObj(vrep_env.VrepEnv):
         self.obj_names = ['obj0', 'obj1', 'obj2', 'obj3', 'obj4']
         self.handle_objs = list(map(self.get_object_handle, self.obj_names))
 
-    def init_multi_obj(self):
-        """For all objects, set the orientation to the default orientation and move out of the camera."""
+        self.rng = np.random.default_rng()
 
+    def init_multi_obj(self, plan=None):
+        """For all objects, set the orientation to the default orientation and move out of the camera.
+
+        :param plan: Record the changes into this plan instead of sending them to V-Rep.
+        :type plan: scene_plan.SceneCommands.
+        """
+
+        target = self if plan is None else plan
         z = -0.15
-        for handle in self.handle_objs:
-            self.obj_set_position(handle, [0, 0, z])
-            self.obj_set_orientation(handle, [0, -np.pi/2, 0])
-
-    def _is_reasonable_distancec(self, x, y, pos_list, threshold=0.04):
-        if len(pos_list) == 0:
-            return True
-        for i in range(len(pos_list)):
-            dist = np.linalg.norm(np.array([x, y]) - np.array(pos_list[i]))
-            if dist < threshold:
-                return False
-        return True
-
-    def random_obj(self):
+        with target.batch():
+            for handle in self.handle_objs:
+                target.obj_set_position(handle, [0, 0, z])
+                target.obj_set_orientation(handle, [0, -np.pi/2, 0])
+
+    def random_obj(self, plan=None):
         """Randomly choose objects and randomly set the position and orientation of chosen objects.
 
+        :param plan: Record the changes into this plan instead of sending them to V-Rep.
+        :type plan: scene_plan.SceneCommands.
         :return: cube_pos, chosen_obj_id
 
         'cube_pos' is a list, which save the position of the target object (cube).
         'chosen_obj_id' is a list, which save the chosen objects' id.
         """
 
+        target = self if plan is None else plan
         cube_pos = []
-        chosen_obj_num = random.randint(1, len(self.obj_names))
-        chosen_obj_id = random.sample(range(len(self.obj_names)), chosen_obj_num)
-        block_id = random.sample(range(9), chosen_obj_num)
-        objs_pos = []
-        for coid, bid in zip(chosen_obj_id, block_id):
-            x, y = self._random_block_pos(bid)
-            while self._is_reasonable_distancec(x, y, objs_pos) is False:
-                x, y = self._random_block_pos(bid)
-            objs_pos.append([x, y])
-            self.obj_set_position(self.handle_objs[coid], [x, y, 0], self.handle_plate)
-            self._rotate_obj(self.handle_objs[coid], 'z')
-            if coid == 0:
-                cube_pos = [x, y]
+        on, _, objs_pos = placement.sample_layouts(1, len(self.obj_names), rng=self.rng)
+        chosen_obj_id = [int(i) for i in np.flatnonzero(on[0])]
+        with target.batch():
+            for coid in chosen_obj_id:
+                x, y = [float(v) for v in objs_pos[0, coid]]
+                target.obj_set_position(self.handle_objs[coid], [x, y, 0], self.handle_plate)
+                self._rotate_obj(self.handle_objs[coid], 'z', plan)
+                if coid == 0:
+                    cube_pos = [x, y]
         return cube_pos, chosen_obj_id
 
-    def _random_block_pos(self, block_id):
-        """Divide the work area into 9 blocks. Randomly select a location([x, y]) within a block.
-
-        :param block_id: The block's id.
-        :type block_id: int value.
-        :return: x, y
-
-        `x` is float value for a random position's X-axis coordinate.
-        `y` is float value for a random position's Y-axis coordinate.
-        """
-        blocked_x = [-0.2, -0.07, 0.07, 0.2]
-        blocked_y = [-0.2, -0.07, 0.07, 0.2]
-        r = int(block_id % 3)
-        c = int(block_id / 3)
-        x = random.uniform(blocked_x[r], blocked_x[r + 1])
-        y = random.uniform(blocked_y[c], blocked_y[c + 1])
-        return x, y
-
-    def _rotate_obj(self, handle, axis):
+    def _rotate_obj(self, handle, axis, plan=None):
         """Rotating an object around a world coordinate axis.
 
         :param handle: Handle of the target object in V-Rep.
                axis: Rotary axis.
                input_radian: A given rotation angle.
+               plan: Record the rotation into this plan instead of sending it to V-Rep.
         :type handle: int value.
               axis: string.
               input_radian: float value.
+              plan: scene_plan.SceneCommands.
         :return: radian
 
         `input_radian` is a float value for rotation angle. `radian` is `None` when there's no specified value.
@@ -103,16 +86,24 @@ class SceneObj(vrep_env.VrepEnv):
         """
 
         radian = random.uniform(-math.radians(180), math.radians(180))
+        if plan is not None:
+            plan.rotate(handle, axis, radian)
+            return radian
         inInts = [handle]
         inFloats = [radian]
         inStrings = [axis]
         emptyBuff = bytearray()
         inData = [inInts, inFloats, inStrings, emptyBuff]
+        # blocking, so that the rotation runs after the position queued before it; several queued calls to
+        # one script function are not guaranteed to all be delivered in order
         self.call_childscript_function('RemotePyApi', 'pyObjRotation', inData)
         return radian
 
-    def random_plate(self):
+    def random_plate(self, plan=None):
         """Move the plate in V-Rep randomly.
+
+        :param plan: Record the changes into this plan instead of sending them to V-Rep.
+        :type plan: scene_plan.SceneCommands.
         """
 
         pos = list(self.plate_pos)
@@ -120,12 +111,16 @@ class SceneObj(vrep_env.VrepEnv):
         pos[0] += random.uniform(-0.03, 0.03)
         pos[1] += random.uniform(-0.03, 0.03)
         ori[2] = random.uniform(math.radians(-5), math.radians(5))
-        self.obj_set_position(self.handle_plate, pos)
-        self.obj_set_orientation(self.handle_plate, ori)
+        target = self if plan is None else plan
+        with target.batch():
+            target.obj_set_position(self.handle_plate, pos)
+            target.obj_set_orientation(self.handle_plate, ori)
 
-    def random_camera(self):
+    def random_camera(self, plan=None):
         """Move the camera in V-Rep randomly.
 
+        :param plan: Record the changes into this plan instead of sending them to V-Rep.
+        :type plan: scene_plan.SceneCommands.
         :return: pos, ori
 
         The type of `pos` is list, length=3 for camera's position relative to Viper.
@@ -137,6 +132,42 @@ class SceneObj(vrep_env.VrepEnv):
         for i in range(3):
             ori[i] = self.camera_ori[i] + random.uniform(math.radians(-3), math.radians(3))
             pos[i] = self.camera_pos[i] + random.uniform(-0.01, 0.01)
-        self.obj_set_orientation(self.handle_camera, ori, self.handle_UR5)
-        self.obj_set_position(self.handle_camera, pos, self.handle_UR5)
-        return pos, ori
\ No newline at end of file
+        target = self if plan is None else plan
+        with target.batch():
+            target.obj_set_orientation(self.handle_camera, ori, self.handle_UR5)
+            target.obj_set_position(self.handle_camera, pos, self.handle_UR5)
+        return pos, ori
+
+    def plan_sample(self, sample, plan):
+        """Record the camera, plate and object poses of a pre-sampled scene into a plan.
+
+        :param sample: One row of `scene_plan.ScenePlan.sample`.
+               plan: The plan of the sample.
+        :type sample: numpy structured array.
+              plan: scene_plan.SceneCommands.
+        :return: camera_pos, camera_ori, cube_pos, chosen_obj_id
+        """
+
+        camera_pos = [float(p + d) for p, d in zip(self.camera_pos, sample['camera_pos'])]
+        camera_ori = [float(o + d) for o, d in zip(self.camera_ori, sample['camera_ori'])]
+        plan.obj_set_orientation(self.handle_camera, camera_ori, self.handle_UR5)
+        plan.obj_set_position(self.handle_camera, camera_pos, self.handle_UR5)
+
+        pos = list(self.plate_pos)
+        ori = list(self.plate_ori)
+        pos[0] += float(sample['plate_offset'][0])
+        pos[1] += float(sample['plate_offset'][1])
+        ori[2] = float(sample['plate_yaw'])
+        plan.obj_set_position(self.handle_plate, pos)
+        plan.obj_set_orientation(self.handle_plate, ori)
+
+        self.init_multi_obj(plan)
+        cube_pos = []
+        chosen_obj_id = [int(i) for i in np.flatnonzero(sample['obj_on'])]
+        for coid in chosen_obj_id:
+            x, y = [float(v) for v in sample['obj_xy'][coid]]
+            plan.obj_set_position(self.handle_objs[coid], [x, y, 0], self.handle_plate)
+            plan.rotate(self.handle_objs[coid], 'z', float(sample['obj_yaw'][coid]))
+            if coid == 0:
+                cube_pos = [x, y]
+        return camera_pos, camera_ori, cube_pos, chosen_obj_id
@@ -1,22 +1,137 @@
 from vrep import vrep_env
+from collect_data.random_env.procedural_texture import TextureRing
+from collections import OrderedDict
 import numpy as np
 import random
 import os
 
+# Where the planes generated by `pyCreateTexture` are kept while their texture is pooled, out of the camera's view.
+POOL_PLANE_POSITION = [0, 0, -1.0]
+
+# Most textures one sample assigns: the plate, the plane and the table, plus one per object
+# (obj0 to obj4, see `random_objects.SceneObj`). A smaller pool would evict textures of the same sample.
+MIN_POOL_SIZE = 3 + 5
+
+
+class TexturePool(object):
+    """Texture files loaded into V-Rep once and reused between samples, least recently used first out.
+
+    `pyCreateTexture` generates a plane holding each texture. The pool keeps these planes, parked under the
+    scene, so that their texture ids stay valid; a sample then only assigns ids with `pySetTexture`.
+    When more than `capacity` textures are loaded, the plane of the least recently used one is removed,
+    so `capacity` must be at least the number of textures one sample uses.
+    """
+
+    def __init__(self, env, texture_path, resolution, capacity=None):
+        """
+        :param env: Component used to talk to V-Rep.
+        :param texture_path: Absolute paths of the texture files.
+        :param resolution: Resolution of the textures.
+        :param capacity: Maximum number of textures kept in V-Rep, all of them when `None`.
+        :type env: vrep_env.VrepEnv.
+              texture_path: list.
+              resolution: list, length=2.
+              capacity: int value.
+        """
+
+        self.env = env
+        self.texture_path = texture_path
+        self.resolution = resolution
+        self.capacity = capacity if capacity is not None else len(texture_path)
+        # texture file index -> (V-Rep texture id, plane name, plane handle), least recently used first
+        self.textures = OrderedDict()
+        self.failed = set()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def acquire(self, t_id):
+        """Return the V-Rep texture id of a texture file, loading it first if it is not in the pool.
+
+        :param t_id: Index of the texture file.
+        :type t_id: int value.
+        :return: texture_id
+
+        Like `Texture._create_texture`, the next file is used when one cannot be loaded.
+        The mapping mode of a texture is drawn once, when it is loaded.
+        """
+
+        for _ in range(len(self.texture_path)):
+            t_id = t_id % len(self.texture_path)
+            if t_id in self.textures:
+                self.stats['hits'] += 1
+                self.textures.move_to_end(t_id)
+                return self.textures[t_id][0]
+            if t_id not in self.failed:
+                texture_id = self._load(t_id)
+                if texture_id != -1:
+                    return texture_id
+            t_id += 1
+        raise RuntimeError('None of the {} texture files could be loaded.'.format(len(self.texture_path)))
+
+    def _load(self, t_id):
+        self.stats['misses'] += 1
+        while len(self.textures) >= self.capacity:
+            self._evict()
+        inInts = [random.randint(0, 15), self.resolution[0], self.resolution[1]]
+        inData = [inInts, [], [self.texture_path[t_id]], bytearray()]
+        ret = self.env.call_childscript_function('RemotePyApi', 'pyCreateTexture', inData)
+        texture_id = ret[1][0]
+        if texture_id == -1:
+            self.failed.add(t_id)
+            return -1
+        name = self._plane_name()
+        handle = self.env.get_object_handle(name)
+        self.env.obj_set_position(handle, POOL_PLANE_POSITION)
+        self.textures[t_id] = (texture_id, name, handle)
+        return texture_id
+
+    def _plane_name(self):
+        """Name V-Rep gave to the last generated plane: the first free one of 'Plane', 'Plane0', 'Plane1', ..."""
+
+        used = set(name for _, name, _ in self.textures.values())
+        name, i = 'Plane', 0
+        while name in used:
+            name = 'Plane' + str(i)
+            i += 1
+        return name
+
+    def _evict(self):
+        _, (_, _, handle) = self.textures.popitem(last=False)
+        self.env.remove_object(handle)
+        self.stats['evictions'] += 1
+
+    def clear(self):
+        """Remove every pooled texture from V-Rep."""
+
+        while self.textures:
+            self._evict()
+
 
 class Texture(vrep_env.VrepEnv):
     """Randomly set texture in V-Rep environment."""
 
-    def __init__(self, cid,
+    def __init__(self, session,
                  texture_directory=None,
-                 texture_num=None):
+                 texture_num=None,
+                 pool_size=None,
+                 procedural_num=0,
+                 procedural_ratio=0.5):
 
         """
-        :param cid: Remote V_Rep simulation window's id.
-        :type cid: int value.
+        :param session: Connection to V-Rep shared with the other components.
+        :param pool_size: Keep up to this many textures loaded in V-Rep between samples (see `TexturePool`),
+            at least `MIN_POOL_SIZE`. The textures are loaded and deleted for every sample when it is `None`.
+        :param procedural_num: Size of the ring of pre-generated procedural textures, 0 to only use the files.
+        :param procedural_ratio: Probability for a texture to be procedural instead of a file.
+        :type session: vrep_env.SimSession.
+              pool_size: int value.
+              procedural_num: int value.
+              procedural_ratio: float value.
+
+        Procedural textures are sent to V-Rep as raw pixels with `pyCreateTextureFromBuffer`
+        (see `scenes/pyCreateTextureFromBuffer.lua`); they cannot be pooled.
         """
 
-        vrep_env.VrepEnv.__init__(self, cid=cid)
+        vrep_env.VrepEnv.__init__(self, session=session)
 
         self.original_color = [0, 0, 0]
         self.texture_num = texture_num
@@ -33,15 +148,29 @@ class Texture(vrep_env.VrepEnv):
         self.obj_num = 0
         self.handle_tar_objs_texture = []
 
-    def random_texture(self, obj, tar_objs_id=None):
+        self.procedural = None
+        self.procedural_ratio = procedural_ratio
+        if procedural_num:
+            if pool_size is not None:
+                raise ValueError('Procedural textures cannot be used with a texture pool.')
+            self.procedural = TextureRing(procedural_num, self.resolution)
+
+        self.pool = None
+        if pool_size is not None:
+            assert pool_size >= MIN_POOL_SIZE, 'the texture pool must hold at least {} textures'.format(MIN_POOL_SIZE)
+            self.pool = TexturePool(self, self.texture_path, self.resolution, pool_size)
+
+    def random_texture(self, obj, tar_objs_id=None, plan=None):
         """Randomly assign color and textures to objects. For inserting task, the bases only change color.
 
         :param obj: List of object names.
                tar_objs_id: List of target objects' id.
                tar_obj_id: The id of some objects which need multiple textures in their corresponding list.
+               plan: Record the changes into this plan instead of sending them to V-Rep.
         :type obj: list.
               tar_objs_id: list.
               tar_obj_id: int value.
+              plan: scene_plan.SceneCommands.
 
         The type of `obj` is list. elements in `obj` must be in
         ['plate', 'plane', 'table', 'tar_objs'].
@@ -49,34 +178,42 @@ class Texture(vrep_env.VrepEnv):
         it would be needed to find these objects' handle.
         `tar_obj_id` is int value. When changing the color of one or multiple parts of a same object at one time,
         it would be needed to find the parts' handle.
+        With a `plan`, the generated texture planes are removed by `pyApplyScenePlan` itself,
+        so `delete_texture` must not be called.
         """
 
         if 'tar_objs' in obj:
             self.obj_num = len(obj) + len(tar_objs_id) - 1
         else:
             self.obj_num = len(obj)
-        self._create_texture()
+        self._create_texture(plan)
 
         for i in range(len(obj)):
             if obj[i] == 'plate':
-                self._set_texture(self.handle_plate_texture, id=i)
-                self._set_color(self.handle_plate_texture)
+                self._set_texture(self.handle_plate_texture, id=i, plan=plan)
+                self._set_color(self.handle_plate_texture, plan=plan)
             elif obj[i] == 'plane':
-                self._set_texture(self.handle_plane_texture, id=i)
-                self._set_color(self.handle_plane_texture, isTransparent=False)
+                self._set_texture(self.handle_plane_texture, id=i, plan=plan)
+                self._set_color(self.handle_plane_texture, isTransparent=False, plan=plan)
             elif obj[i] == 'table':
-                self._set_texture(self.handle_table_texture, id=i)
-                self._set_color(self.handle_table_texture)
+                self._set_texture(self.handle_table_texture, id=i, plan=plan)
+                self._set_color(self.handle_table_texture, plan=plan)
             elif obj[i] == 'tar_objs':
                 self.handle_tar_objs_texture = []
                 for j in range(len(tar_objs_id)):
                     handle_tar_obj_texture = self.get_object_handle('obj'+str(tar_objs_id[j])+'_texture0')
                     self.handle_tar_objs_texture.append(handle_tar_obj_texture)
-                    self._set_texture(handle_tar_obj_texture, id=i)
-                    self._set_color(handle_tar_obj_texture, isTransparent=False)
+                    self._set_texture(handle_tar_obj_texture, id=i, plan=plan)
+                    self._set_color(handle_tar_obj_texture, isTransparent=False, plan=plan)
 
     def delete_texture(self):
-        """Delete the textures that were entered into V_Rep and free up memory space"""
+        """Delete the textures that were entered into V_Rep and free up memory space
+
+        Pooled textures are kept for the next samples; `pool.clear()` deletes them.
+        """
+
+        if self.pool is not None:
+            return
 
         obj_names = []
         for i in range(self.obj_num):
@@ -86,18 +223,36 @@ class Texture(vrep_env.VrepEnv):
                 obj_names.append('Plane' + str(i - 1))
         texture_handles = list(map(self.get_object_handle, obj_names))
         for handle in texture_handles:
-            self.call_childscript_function('RemotePyApi', 'pyRemoveObj', [[handle], [], [], bytearray()])
+            self.remove_object(handle)
+
+    def _create_texture(self, plan=None):
+        """Make pictures enter into V-Rep and automatically generate corresponding handles of textures in V-Rep
 
-    def _create_texture(self):
-        """Make pictures enter into V-Rep and automatically generate corresponding handles of textures in V-Rep"""
+        :param plan: Record the texture creation into this plan instead of sending it to V-Rep.
+        :type plan: scene_plan.SceneCommands.
+
+        With a `plan`, `texture_id` holds the plan's texture slots instead of V-Rep texture ids.
+        """
 
         inInts = [random.randint(0, 15), self.resolution[0], self.resolution[1]]
         inFloats = []
         emptyBuff = bytearray()
         self.texture_id = []
         texture_id = random.sample(range(self.texture_num), self.obj_num)
+        if plan is not None:
+            for t_id in texture_id:
+                self.texture_id.append(plan.create_texture(self.texture_path[t_id], random.randint(0, 15), self.resolution))
+            return
+        if self.pool is not None:
+            self.texture_id = [self.pool.acquire(t_id) for t_id in texture_id]
+            return
         for t_id in texture_id:
             inInts[0] = random.randint(0, 15)
+            if self.procedural is not None and random.uniform(0, 1.0) < self.procedural_ratio:
+                ret = self._create_procedural_texture(inInts)
+                if ret != -1:
+                    self.texture_id.append(ret)
+                    continue
             while True:
                 inStrings = [self.texture_path[t_id]]
                 inData = [inInts, inFloats, inStrings, emptyBuff]
@@ -108,15 +263,29 @@ class Texture(vrep_env.VrepEnv):
                     self.texture_id.append(ret[1][0])
                     break
 
-    def _set_texture(self, handle, id=0, isRemove=False):
+    def _create_procedural_texture(self, inInts):
+        """Send the next texture of the procedural ring to V-Rep as raw RGB pixels.
+
+        :param inInts: Mapping mode and resolution, as for `pyCreateTexture`.
+        :type inInts: list.
+        :return: The id of the texture in V-Rep, -1 if it could not be created.
+        """
+
+        inData = [inInts, [], [], self.procedural.next()]
+        ret = self.call_childscript_function('RemotePyApi', 'pyCreateTextureFromBuffer', inData)
+        return ret[1][0]
+
+    def _set_texture(self, handle, id=0, isRemove=False, plan=None):
         """Set or remove a texture to an object.
 
         :param handle: Handle of the target object in V-Rep.
                id: The id of the texture entered into V-Rep.
                isRemove: Add or remove the object's texture.
+               plan: Record the change into this plan instead of sending it to V-Rep.
         :type handle: int value.
               id: int value.
               isRemove: bool.
+              plan: scene_plan.SceneCommands.
 
         `isRemove` is bool value. `isRemove` is `True` when remove the texture of the object, `False` otherwise.
         """
@@ -130,20 +299,25 @@ class Texture(vrep_env.VrepEnv):
         inInts.append(random.randint(0, 15))
         inInts += list(np.random.randint(-180, 180, size=3))
         inFloats = list(np.random.uniform(-1.0, 1.0, size=3))
+        if plan is not None:
+            plan.set_texture(handle, texture, inInts[2], inInts[3:], inFloats)
+            return
         inStrings = []
         emptyBuff = bytearray()
         inData = [inInts, inFloats, inStrings, emptyBuff]
         self.call_childscript_function('RemotePyApi', 'pySetTexture', inData)
 
-    def _set_color(self, handle, isTransparent=True, rgb=None):
+    def _set_color(self, handle, isTransparent=True, rgb=None, plan=None):
         """Set a color to an object.
 
         :param handle: Handle of the target object in V-Rep.
                isTransparent: The object could be transparent or not.
                rgb: A set of given RGB values.
+               plan: Record the change into this plan instead of sending it to V-Rep.
         :type handle: int value.
               isTransparent: bool.
               rgb: list, length=3.
+              plan: scene_plan.SceneCommands.
 
         The type of `isTransparent` is bool.
             `isTransparent` is `True` when the object could be transparent, `False` otherwise.
@@ -159,7 +333,38 @@ class Texture(vrep_env.VrepEnv):
             inFloats.append(1.0)
         else:
             inFloats.append(random.uniform(0, 1.0))
+        if plan is not None:
+            plan.set_color(handle, inFloats)
+            return
         inStrings = []
         emptyBuff = bytearray()
         inData = [inInts, inFloats, inStrings, emptyBuff]
         self.call_childscript_function('RemotePyApi', 'pySetColor', inData)
+
+    def plan_sample(self, sample, chosen_obj_id, plan):
+        """Record the textures and colors of a pre-sampled scene into a plan.
+
+        :param sample: One row of `scene_plan.ScenePlan.sample`.
+               chosen_obj_id: List of the chosen objects' id.
+               plan: The plan of the sample.
+        :type sample: numpy structured array.
+              chosen_obj_id: list.
+              plan: scene_plan.SceneCommands.
+
+        Only the textures that are used are created: one each for the plate, the plane and the table,
+        and one shared by the chosen objects.
+        """
+
+        slots = []
+        for t_id, mode in zip(sample['texture_id'], sample['texture_mode']):
+            slots.append(plan.create_texture(self.texture_path[int(t_id) % self.texture_num], int(mode), self.resolution))
+
+        surfaces = [(self.handle_plate_texture, 0), (self.handle_plane_texture, 1), (self.handle_table_texture, 2)]
+        for coid in chosen_obj_id:
+            surfaces.append((self.get_object_handle('obj' + str(coid) + '_texture0'), 3 + coid))
+        for handle, surface in surfaces:
+            slot = slots[min(surface, 3)]
+            plan.set_texture(handle, slot, int(sample['surface_mode'][surface]),
+                             [int(v) for v in sample['surface_rot'][surface]],
+                             [float(v) for v in sample['surface_offset'][surface]])
+            plan.set_color(handle, [float(v) for v in sample['surface_rgba'][surface]])
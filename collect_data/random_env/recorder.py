@@ -1,28 +1,249 @@
 import datetime
+import io
 import json
 import os
-from matplotlib.pyplot import imsave
+import queue
+import threading
 import uuid
+import numpy as np
+from PIL import Image
+from collect_data.random_env.shards import ShardWriter
+
+# Image formats written by `Recorder`: 'jpg' and 'png' are encoded with PIL, 'npy' is the raw array.
+IMAGE_FORMATS = ['jpg', 'png', 'npy']
+
+# Directory of the memory-mapped tensor store of a dataset, see `tensor_store.TensorStore`.
+TENSOR_STORE_DIR = 'tensors'
+
+# Append-only manifest of a dataset: one JSON line per written sample, with its labels and where its image is.
+MANIFEST_FILE = 'manifest.jsonl'
+
+
+def next_sample_id(save_path):
+    """Sample id after the last one in the manifest of a dataset, 0 without a manifest.
+
+    A collection into an existing dataset starts there, so that its ranges do not replace the samples and
+    shards of the earlier collections.
+    """
+
+    last = -1
+    path = os.path.join(save_path, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        for line in f:
+            try:
+                sample_id = json.loads(line).get('sample_id')
+            except ValueError:
+                continue
+            if sample_id is not None:
+                last = max(last, sample_id)
+    return last + 1
 
 
 class Recorder(object):
-    def __init__(self, save_path):
+    """Write the collected samples to `save_path`, one `<id>.json` and one image file per sample.
+
+    With `workers > 0`, `add_record` only queues the sample: background threads encode the image and
+    write the files while the next scene is randomized. The queue holds at most `queue_size` samples,
+    `add_record` blocks when it is full. `close` (or leaving a `with` block) waits until every queued
+    sample is written. Once a write fails, the samples still queued are not written, and `add_record`,
+    `flush` and `close` raise the error with the number of these samples.
+
+    With a `shard_size`, the samples are appended to tar shards instead (see `shards.ShardWriter`),
+    and `image_path` is the name of the image in its shard.
+
+    Every written sample is also appended to `MANIFEST_FILE`: its record, plus `shard` and the `json` and
+    `image` [offset, size] of its data when it is in a shard. A line is only added once the sample's files
+    are written, so loaders can read all the labels at once instead of listing the directory.
+
+    With a `store_size`, the frames are also resized and appended to the tensor store in `TENSOR_STORE_DIR`,
+    which the network can train from without decoding any image; `store_row` is their row in it.
+
+    Between `start_range` and `commit_range`, the samples of a range are staged: their manifest lines are held
+    and their shards written under temporary names, so that a range that fails half-way leaves nothing in
+    the dataset and can be collected again.
+    """
+
+    def __init__(self, save_path, workers=2, queue_size=32, image_format='jpg', quality=95, shard_size=None,
+                 manifest=True, store_size=None):
+        """
+        :param save_path: Directory of the dataset.
+        :param workers: Number of writer threads, 0 to write in `add_record`.
+        :param queue_size: Maximum number of samples waiting to be written.
+        :param image_format: One of `IMAGE_FORMATS`.
+        :param quality: JPEG quality, from 1 to 95.
+        :param shard_size: Number of samples per shard, `None` to write separate files.
+        :param manifest: Append the written samples to `MANIFEST_FILE`.
+        :param store_size: Size of the frames of the tensor store, `None` to not write it.
+        """
+
+        assert image_format in IMAGE_FORMATS, 'image format must be one of {}'.format(IMAGE_FORMATS)
         self.save_path = save_path
         if not os.path.exists(self.save_path):
             os.mkdir(self.save_path)
+        self.image_format = image_format
+        self.quality = quality
+        self.shards = None
+        if shard_size is not None:
+            self.shards = ShardWriter(self.save_path, shard_size)
+        self.store = None
+        if store_size is not None:
+            # imported here: the store needs a file lock, which is not needed to write files or shards
+            from collect_data.random_env.tensor_store import TensorStore
+            self.store = TensorStore(os.path.join(self.save_path, TENSOR_STORE_DIR), store_size)
+        self.manifest = manifest
+        self.manifest_file = None
+        self.manifest_lock = threading.Lock()
+        self.staged_lines = None
 
-    def add_record(self, record):
-        image = record['image']
-        step_num = record['step_num']
-        camera_ori = record['camera_ori']
-        camera_pos = record['camera_pos']
-        target_location = record['target_location']
+        self.error = None
+        self.skipped = 0
+        self.queue = None
+        self.threads = []
+        if workers > 0:
+            self.queue = queue.Queue(maxsize=queue_size)
+            for _ in range(workers):
+                thread = threading.Thread(target=self._work, daemon=True)
+                thread.start()
+                self.threads.append(thread)
 
+    def add_record(self, record):
+        self._check()
         record_id = datetime.datetime.now().strftime('%Y%m%d%H%M%S%f')+uuid.uuid4().hex
-        image_path = os.path.join(self.save_path, record_id+'.jpg')
-        json_file = open(os.path.join(self.save_path, record_id+'.json'), 'w')
-        record = {'id': record_id, 'image_path': image_path, 'step_num': step_num,
-                  'camera_ori': camera_ori, 'camera_pos': camera_pos, 'target_location': target_location}
-        json.dump(record, json_file)
-        json_file.close()
-        imsave(image_path, image)
+        if self.queue is None:
+            self._write(record_id, record)
+        else:
+            self.queue.put((record_id, record))
+        return record_id
+
+    def _work(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                if self.error is None:
+                    self._write(*item)
+                else:
+                    with self.manifest_lock:
+                        self.skipped += 1
+            except Exception as e:
+                self.error = e
+            finally:
+                self.queue.task_done()
+
+    def _write(self, record_id, record):
+        image_name = record_id + '.' + self.image_format
+        image_array = record['image']
+        image = self._encode_image(image_array)
+        if self.shards is None:
+            image_path = os.path.join(self.save_path, image_name)
+        else:
+            image_path = image_name
+        record = {'id': record_id, 'sample_id': record.get('sample_id'), 'image_path': image_path,
+                  'version': record.get('version'), 'step_num': record['step_num'], 'camera_ori': record['camera_ori'],
+                  'camera_pos': record['camera_pos'], 'target_location': record['target_location']}
+        if self.store is not None:
+            record['store_row'] = self.store.append(image_array, record['target_location'])
+        if self.shards is not None:
+            entry = self.shards.write(record_id, record, image, self.image_format)
+            self._append_manifest(dict(record, shard=entry['shard'], json=entry['json'], image=entry['image']))
+            return
+        with open(image_path, 'wb') as image_file:
+            image_file.write(image)
+        with open(os.path.join(self.save_path, record_id + '.json'), 'w') as json_file:
+            json.dump(record, json_file)
+        self._append_manifest(record)
+
+    def _append_manifest(self, line):
+        if not self.manifest:
+            return
+        line = json.dumps(line) + '\n'
+        with self.manifest_lock:
+            if self.staged_lines is not None:
+                self.staged_lines.append(line)
+                return
+            self._write_manifest(line)
+
+    def _write_manifest(self, lines):
+        if self.manifest_file is None:
+            # one `write` per line in append mode, so that several collectors can share a manifest
+            self.manifest_file = open(os.path.join(self.save_path, MANIFEST_FILE), 'a', buffering=1)
+        self.manifest_file.write(lines)
+
+    def _encode_image(self, image):
+        buffer = io.BytesIO()
+        if self.image_format == 'npy':
+            np.save(buffer, image)
+        elif self.image_format == 'jpg':
+            Image.fromarray(image).save(buffer, format='JPEG', quality=self.quality)
+        else:
+            Image.fromarray(image).save(buffer, format='PNG')
+        return buffer.getvalue()
+
+    def _check(self):
+        # the error stays set: the samples queued behind the failed one are dropped and counted instead
+        if self.error is not None:
+            raise RuntimeError('Writing a record failed: {!r}; {} queued records after it were not written.'.format(
+                self.error, self.skipped))
+
+    def flush(self):
+        """Wait until every queued sample is written."""
+
+        if self.queue is not None:
+            self.queue.join()
+        if self.store is not None:
+            self.store.flush()
+        self._check()
+
+    def start_range(self, name=None):
+        """Write the queued samples, then stage the next ones until `commit_range`.
+
+        :param name: Name of the shards of the range, which replace the shards of an earlier attempt.
+            Needed when the recorder writes shards.
+        """
+
+        self.flush()
+        if self.shards is not None:
+            assert name is not None, 'the shards of a range need a name'
+            self.shards.start(name, staged=True)
+        with self.manifest_lock:
+            self.staged_lines = []
+
+    def commit_range(self):
+        """Write the queued samples of the range, then give its shards their names and add it to the manifest."""
+
+        self.flush()
+        if self.shards is not None:
+            self.shards.commit()
+        with self.manifest_lock:
+            lines, self.staged_lines = self.staged_lines, None
+            if lines:
+                self._write_manifest(''.join(lines))
+
+    def close(self):
+        """Write the queued samples and stop the writer threads."""
+
+        if self.threads:
+            for _ in self.threads:
+                self.queue.put(None)
+            for thread in self.threads:
+                thread.join()
+            self.threads = []
+            self.queue = None
+        if self.shards is not None:
+            self.shards.close()
+        if self.store is not None:
+            self.store.close()
+        with self.manifest_lock:
+            if self.manifest_file is not None:
+                self.manifest_file.close()
+                self.manifest_file = None
+        self._check()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
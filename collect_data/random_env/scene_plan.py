@@ -0,0 +1,222 @@
+from vrep import sim
+from collect_data.random_env import placement
+import numpy as np
+import contextlib
+import math
+
+# Opcodes of the commands understood by `pyApplyScenePlan` (see `collect_data/scenes/pyApplyScenePlan.lua`).
+SET_POSITION = 1
+SET_ORIENTATION = 2
+ROTATE = 3
+SET_LIGHT = 4
+CREATE_TEXTURE = 5
+SET_TEXTURE = 6
+SET_COLOR = 7
+
+# Every command is one fixed-size little-endian record: opcode, 6 int32 arguments, 4 float32 arguments.
+RECORD_FORMAT = 'i6i4f'
+RECORD_INTS = 6
+RECORD_FLOATS = 4
+
+AXES = {'x': 0, 'y': 1, 'z': 2}
+
+
+class SceneCommands(object):
+    """Every change of one randomized sample, applied by V-Rep in a single `pyApplyScenePlan` call.
+
+    `obj_set_position`, `obj_set_orientation` and `batch` have the signature of the `VrepEnv` methods,
+    so the randomizers can record into a plan instead of calling V-Rep.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.strings = []
+        self.texture_num = 0
+
+    def _add(self, opcode, ints, floats=()):
+        ints = list(ints) + [0] * (RECORD_INTS - len(ints))
+        floats = list(floats) + [0.] * (RECORD_FLOATS - len(floats))
+        self.records.append([opcode] + ints + floats)
+
+    @contextlib.contextmanager
+    def batch(self, confirm=False):
+        """Nothing to batch: a plan is sent in one call anyway."""
+
+        yield self
+
+    def obj_set_position(self, handle, position, relativeToObjectHandle=-1):
+        self._add(SET_POSITION, [handle, relativeToObjectHandle], position)
+
+    def obj_set_orientation(self, handle, orientation, relativeToObjectHandle=-1):
+        self._add(SET_ORIENTATION, [handle, relativeToObjectHandle], orientation)
+
+    def rotate(self, handle, axis, radian):
+        """Rotate an object around a world axis ('x', 'y' or 'z'), like `pyObjRotation`."""
+
+        self._add(ROTATE, [handle, AXES[axis]], [radian])
+
+    def set_light(self, handle, on, rgb=(0., 0., 0.)):
+        """Turn a light off, or on with the diffuse color `rgb`, like `pySetLights`."""
+
+        self._add(SET_LIGHT, [int(on), handle], rgb)
+
+    def create_texture(self, texture_path, mapping_mode, resolution):
+        """Load a texture file, like `pyCreateTexture`.
+
+        :return: slot
+
+        `slot` is the index of the created texture, used by `set_texture`.
+        When the file cannot be loaded, V-Rep falls back to the next texture path of the plan.
+        """
+
+        self.strings.append(texture_path)
+        self._add(CREATE_TEXTURE, [len(self.strings) - 1, mapping_mode, resolution[0], resolution[1]])
+        self.texture_num += 1
+        return self.texture_num - 1
+
+    def set_texture(self, handle, slot, mapping_mode, rotation, offset):
+        """Apply the texture created in `slot` to an object, like `pySetTexture`."""
+
+        self._add(SET_TEXTURE, [handle, slot, mapping_mode] + list(rotation), offset)
+
+    def set_color(self, handle, rgba):
+        """Set the color and transparency of an object, like `pySetColor`."""
+
+        self._add(SET_COLOR, [handle], rgba)
+
+    def pack(self):
+        """Pack the commands into the `inputBuffer` of `pyApplyScenePlan`."""
+
+        return sim.simxPackRecords(RECORD_FORMAT, self.records)
+
+
+# Surfaces that get a texture and a color: plate, plane and table, then one per object.
+SURFACES = ['plate', 'plane', 'table']
+
+
+def plan_dtype(obj_num=5, light_num=(4, 4, 4)):
+    """Structured dtype of one pre-sampled scene.
+
+    :param obj_num: Number of objects in the scene.
+    :param light_num: Numbers of directional, spot and omnidirectional lights.
+    :return: numpy.dtype
+
+    Camera and plate fields are offsets from their pose in the scene. Lights are ordered directional,
+    spot, then omnidirectional. Texture slots 0-2 go to the plate, the plane and the table, slot 3 to
+    every object; surfaces 0-2 are the plate, the plane and the table, surface `3 + i` is object `i`.
+    """
+
+    lights = sum(light_num)
+    surfaces = len(SURFACES) + obj_num
+    return np.dtype([
+        ('camera_pos', 'f4', 3), ('camera_ori', 'f4', 3),
+        ('plate_offset', 'f4', 2), ('plate_yaw', 'f4'),
+        ('light_on', '?', lights), ('light_rgb', 'f4', (lights, 3)),
+        ('light_pos', 'f4', (lights, 3)), ('light_ori', 'f4', (lights, 3)),
+        ('obj_on', '?', obj_num), ('obj_block', 'i4', obj_num), ('obj_xy', 'f4', (obj_num, 2)), ('obj_yaw', 'f4', obj_num),
+        ('texture_id', 'i4', len(SURFACES) + 1), ('texture_mode', 'i4', len(SURFACES) + 1),
+        ('surface_mode', 'i4', surfaces), ('surface_rot', 'i4', (surfaces, 3)),
+        ('surface_offset', 'f4', (surfaces, 3)), ('surface_rgba', 'f4', (surfaces, 4)),
+    ])
+
+
+class ScenePlan(object):
+    """Sample the domain randomization of many scenes at once with numpy.
+
+    The distributions are the ones of `SceneObj`, `Light` and `Texture`. The samples are a structured
+    array (see `plan_dtype`) that can be saved, sharded between workers and applied one row at a time
+    with `RandomEnv.run(sample)`.
+    """
+
+    def __init__(self, texture_num=125, obj_num=5, light_num=(4, 4, 4), seed=None):
+        """
+        :param texture_num: Amount of the texture files.
+        :param obj_num: Number of objects in the scene.
+        :param light_num: Numbers of directional, spot and omnidirectional lights.
+        :param seed: Seed of the random generator.
+        """
+
+        self.texture_num = texture_num
+        self.obj_num = obj_num
+        self.light_num = tuple(light_num)
+        self.dtype = plan_dtype(obj_num, light_num)
+        self.rng = np.random.default_rng(seed)
+
+    def sample(self, n):
+        """Sample `n` scenes.
+
+        :return: plans
+
+        `plans` is a structured numpy array of shape (n,) and dtype `plan_dtype`.
+        """
+
+        rng = self.rng
+        plans = np.zeros(n, dtype=self.dtype)
+
+        plans['camera_pos'] = rng.uniform(-0.01, 0.01, size=(n, 3))
+        plans['camera_ori'] = rng.uniform(math.radians(-3), math.radians(3), size=(n, 3))
+        plans['plate_offset'] = rng.uniform(-0.03, 0.03, size=(n, 2))
+        plans['plate_yaw'] = rng.uniform(math.radians(-5), math.radians(5), size=n)
+
+        self._sample_lights(plans)
+        self._sample_objects(plans)
+        self._sample_textures(plans)
+        return plans
+
+    def _sample_lights(self, plans):
+        rng = self.rng
+        n = len(plans)
+        on = []
+        for num in self.light_num:
+            # `Light._random_lighton`: draw between 0 and `num` lights of the type, with replacement
+            count = rng.integers(0, num + 1, size=n)
+            picks = rng.integers(0, num, size=(n, num))
+            valid = np.arange(num) < count[:, None]
+            on.append(((picks[:, :, None] == np.arange(num)) & valid[:, :, None]).any(axis=1))
+        plans['light_on'] = np.concatenate(on, axis=1)
+        lights = sum(self.light_num)
+        plans['light_rgb'] = rng.uniform(0.0, 1.0, size=(n, lights, 3))
+        xy = rng.uniform(-2.5, 2.5, size=(n, lights))
+        plans['light_pos'] = np.stack([xy, xy, rng.uniform(0, 5.0, size=(n, lights))], axis=2)
+        plans['light_ori'] = rng.integers(-180, 180, size=(n, lights, 3))
+
+    def _sample_objects(self, plans):
+        on, blocks, xy = placement.sample_layouts(len(plans), self.obj_num, rng=self.rng)
+        plans['obj_on'] = on
+        plans['obj_block'] = blocks
+        plans['obj_xy'] = xy
+        plans['obj_yaw'] = self.rng.uniform(-math.pi, math.pi, size=(len(plans), self.obj_num))
+
+    def _sample_textures(self, plans):
+        rng = self.rng
+        n = len(plans)
+        slots = plans.dtype['texture_id'].shape[0]
+        surfaces = plans.dtype['surface_mode'].shape[0]
+        plans['texture_id'] = np.argsort(rng.random((n, self.texture_num)), axis=1)[:, :slots]
+        plans['texture_mode'] = rng.integers(0, 16, size=(n, slots))
+        plans['surface_mode'] = rng.integers(0, 16, size=(n, surfaces))
+        plans['surface_rot'] = rng.integers(-180, 180, size=(n, surfaces, 3))
+        plans['surface_offset'] = rng.uniform(-1.0, 1.0, size=(n, surfaces, 3))
+        plans['surface_rgba'][:, :, :3] = rng.uniform(0.0, 1.0, size=(n, surfaces, 3))
+        # `Texture._set_color`: the plate and the table may be transparent half of the time
+        alpha = np.where(rng.random((n, surfaces)) > 0.5, 1.0, rng.uniform(0.0, 1.0, size=(n, surfaces)))
+        transparent = np.zeros(surfaces, dtype=bool)
+        transparent[[SURFACES.index('plate'), SURFACES.index('table')]] = True
+        plans['surface_rgba'][:, :, 3] = np.where(transparent, alpha, 1.0)
+
+    @staticmethod
+    def save(path, plans):
+        np.save(path, plans)
+
+    @staticmethod
+    def load(path, mmap=True):
+        """Load plans saved with `save`, memory-mapped by default."""
+
+        return np.load(path, mmap_mode='r' if mmap else None)
+
+    @staticmethod
+    def shard(plans, worker_id, worker_num):
+        """Return the contiguous, non-overlapping part of `plans` of one worker."""
+
+        bounds = np.linspace(0, len(plans), worker_num + 1).astype(int)
+        return plans[bounds[worker_id]:bounds[worker_id + 1]]
@@ -0,0 +1,138 @@
+import datetime
+import io
+import json
+import os
+import tarfile
+import threading
+import time
+import uuid
+
+# A shard is a plain tar file `<name>.tar` holding `<id>.json` and `<id>.<image format>` for every sample,
+# next to an index `<name>.idx` with one JSON line per sample:
+#   {"id": ..., "json": [offset, size], "image": [offset, size], "image_format": ...}
+# where offsets and sizes locate the member's data in the tar file.
+SHARD_EXT = '.tar'
+INDEX_EXT = '.idx'
+# Suffix of the files of a staged shard until it is committed, see `ShardWriter.start`.
+STAGED_EXT = '.tmp'
+
+
+def _block_size(size):
+    return (size + tarfile.BLOCKSIZE - 1) // tarfile.BLOCKSIZE * tarfile.BLOCKSIZE
+
+
+class ShardWriter(object):
+    """Append samples to tar shards of at most `shard_size` samples, with an offset index per shard."""
+
+    def __init__(self, save_path, shard_size=1000, prefix=None):
+        """
+        :param save_path: Directory of the shards.
+        :param shard_size: Number of samples in a shard.
+        :param prefix: Name prefix of the shards. Unique to this writer when `None`,
+            so that several collectors can write to the same directory.
+        """
+
+        self.save_path = save_path
+        self.shard_size = shard_size
+        if prefix is None:
+            prefix = datetime.datetime.now().strftime('%Y%m%d%H%M%S') + uuid.uuid4().hex[:8]
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.shard_num = 0
+        self.count = 0
+        self.tar = None
+        self.index = None
+        self.staged = None
+
+    def _open(self):
+        name = os.path.join(self.save_path, '{}-{:05d}'.format(self.prefix, self.shard_num))
+        suffix = ''
+        if self.staged is not None:
+            suffix = STAGED_EXT
+            self.staged.append(name)
+        self.tar = tarfile.open(name + SHARD_EXT + suffix, 'w', format=tarfile.USTAR_FORMAT)
+        self.index = open(name + INDEX_EXT + suffix, 'w')
+        self.shard_num += 1
+        self.count = 0
+        return os.path.basename(name + SHARD_EXT)
+
+    def _add(self, name, data, mtime):
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = mtime
+        self.tar.addfile(info, io.BytesIO(data))
+        # `offset` is the end of the member, padded to a whole block
+        return [self.tar.offset - _block_size(len(data)), len(data)]
+
+    def write(self, record_id, record, image, image_format):
+        """Append one sample.
+
+        :param record_id: Id of the sample.
+        :param record: Labels of the sample, saved as `<id>.json`.
+        :param image: Encoded image, saved as `<id>.<image_format>`.
+        :type record: dict.
+              image: bytes.
+        :return: entry
+
+        `entry` is the index entry of the sample, plus the file name of its shard in `shard`.
+        """
+
+        with self.lock:
+            if self.tar is None:
+                self.shard = self._open()
+            mtime = int(time.time())
+            entry = {'id': record_id, 'image_format': image_format,
+                     'json': self._add(record_id + '.json', json.dumps(record).encode('utf-8'), mtime),
+                     'image': self._add(record_id + '.' + image_format, image, mtime)}
+            self.index.write(json.dumps(entry) + '\n')
+            # readers may look the sample up as soon as `write` returns
+            self.tar.fileobj.flush()
+            self.index.flush()
+            entry['shard'] = self.shard
+            self.count += 1
+            if self.count >= self.shard_size:
+                self._close()
+            return entry
+
+    def _close(self):
+        if self.tar is not None:
+            self.tar.close()
+            self.index.close()
+            self.tar = None
+            self.index = None
+
+    def start(self, prefix, staged=False):
+        """Finish the current shard; the next ones are named after `prefix`.
+
+        With `staged`, the next shards are written under temporary names and only get their names on
+        `commit`, replacing the shards of an earlier attempt. Shards that are never committed stay hidden
+        from the readers and are overwritten when the same `prefix` is started again.
+        """
+
+        with self.lock:
+            self._close()
+            self.prefix = prefix
+            self.shard_num = 0
+            self.staged = [] if staged else None
+
+    def commit(self):
+        """Finish the current shard and give the staged shards their names.
+
+        :return: The file names of the committed shards.
+        """
+
+        with self.lock:
+            self._close()
+            committed = []
+            for name in self.staged or []:
+                os.replace(name + INDEX_EXT + STAGED_EXT, name + INDEX_EXT)
+                os.replace(name + SHARD_EXT + STAGED_EXT, name + SHARD_EXT)
+                committed.append(os.path.basename(name + SHARD_EXT))
+            self.staged = None
+            return committed
+
+    def close(self):
+        """Finish the current shard."""
+
+        with self.lock:
+            self._close()
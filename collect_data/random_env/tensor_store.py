@@ -0,0 +1,192 @@
+import contextlib
+import json
+import os
+import threading
+import numpy as np
+from PIL import Image
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# A tensor store is a directory holding raw arrays that `np.memmap` can open directly:
+#   images.u8  uint8   (capacity, 3, size, size)  frames resized to the input of the network, channels first
+#   labels.f4  float32 (capacity, 3)              label (1 if there is a target, 0 otherwise), target x, target y
+#   meta.json  {"count": ..., "capacity": ..., "image_shape": [3, size, size]}
+#   store.lock                                    locked by a writer while it takes rows
+# Only the first `count` rows are used; the files grow by doubling `capacity`. Writers take rows in blocks,
+# so rows taken by a writer that stopped before using them are left in the store, with a NaN label.
+IMAGES_FILE = 'images.u8'
+LABELS_FILE = 'labels.f4'
+META_FILE = 'meta.json'
+LOCK_FILE = 'store.lock'
+LABEL_COLUMNS = 3
+
+
+def _lock(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+
+
+def _unlock(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+def make_label(target_location):
+    """Label row of a sample, as in `obj_detection/data/data_loader.make_dataset`."""
+
+    if len(target_location) == 0:
+        return [0., 0., 0.]
+    return [1., target_location[0], target_location[1]]
+
+
+class TensorStore(object):
+    """Append frames, resized to the network's input, and their labels to growable memory-mapped arrays.
+
+    Several processes can append to the same store. A writer takes `block` rows at a time under a lock of
+    `LOCK_FILE` and counts them in `meta.json` then, so a row returned by `append` is never given to another
+    writer, nor overwritten after a crash. The rows a writer took but did not use are given back on `close`
+    when no other writer took rows after them.
+    """
+
+    def __init__(self, directory, image_size=224, capacity=1024, block=256):
+        """
+        :param directory: Directory of the store. An existing store is appended to.
+        :param image_size: Width and height of the stored frames.
+        :param capacity: Initial number of rows of a new store.
+        :param block: Number of rows taken at a time.
+        """
+
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.image_shape = (3, image_size, image_size)
+        self.block = block
+        self.lock = threading.Lock()
+        self.lock_fd = os.open(os.path.join(directory, LOCK_FILE), os.O_RDWR | os.O_CREAT)
+        self.capacity = None
+        # rows [next_row, block_end) are taken by this writer and not used yet
+        self.next_row = 0
+        self.block_end = 0
+        with self._locked():
+            if not self._load_meta():
+                self.count = 0
+                self._map(capacity)
+                self._save_meta()
+
+    @contextlib.contextmanager
+    def _locked(self):
+        _lock(self.lock_fd)
+        try:
+            yield
+        finally:
+            _unlock(self.lock_fd)
+
+    def _load_meta(self):
+        """Read the count of the store, and map the files again if another writer grew them."""
+
+        meta_path = os.path.join(self.directory, META_FILE)
+        if not os.path.exists(meta_path):
+            return False
+        with open(meta_path) as f:
+            meta = json.load(f)
+        assert tuple(meta['image_shape']) == self.image_shape, 'the store has frames of another size'
+        self.count = meta['count']
+        if meta['capacity'] != self.capacity:
+            self._map(meta['capacity'])
+        return True
+
+    def _take_block(self):
+        with self._locked():
+            self._load_meta()
+            while self.count + self.block > self.capacity:
+                self._grow()
+            self.next_row = self.count
+            self.block_end = self.count + self.block
+            self.labels[self.next_row:self.block_end] = np.nan
+            self.count = self.block_end
+            self._save_meta()
+
+    def _map(self, capacity):
+        self.capacity = capacity
+        self.images = self._open(IMAGES_FILE, np.uint8, (capacity,) + self.image_shape)
+        self.labels = self._open(LABELS_FILE, np.float32, (capacity, LABEL_COLUMNS))
+
+    def _open(self, name, dtype, shape):
+        path = os.path.join(self.directory, name)
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        with open(path, 'ab') as f:
+            if f.tell() < size:
+                f.truncate(size)
+        return np.memmap(path, dtype=dtype, mode='r+', shape=shape)
+
+    def _grow(self):
+        self.images.flush()
+        self.labels.flush()
+        self._map(self.capacity * 2)
+
+    def _save_meta(self):
+        meta = {'count': self.count, 'capacity': self.capacity, 'image_shape': list(self.image_shape)}
+        path = os.path.join(self.directory, META_FILE)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(path + '.tmp', path)
+
+    def resize(self, image):
+        """Resize an (H, W, 3) uint8 frame to the stored (3, size, size) layout.
+
+        Grayscale (H, W) frames are repeated over the 3 channels.
+        """
+
+        size = self.image_shape[1:]
+        if image.ndim == 2:
+            image = np.repeat(image[:, :, None], 3, axis=2)
+        if image.shape[:2] != size:
+            image = np.asarray(Image.fromarray(image).resize((size[1], size[0]), Image.LANCZOS))
+        return image.transpose(2, 0, 1)
+
+    def append(self, image, target_location):
+        """Append one frame and its label.
+
+        :param image: The camera image.
+        :param target_location: Position of the target, empty when there is none.
+        :type image: numpy array, shape=(H, W, 3).
+              target_location: list.
+        :return: The row of the frame.
+        """
+
+        frame = self.resize(image)
+        with self.lock:
+            if self.next_row == self.block_end:
+                self._take_block()
+            row = self.next_row
+            self.images[row] = frame
+            self.labels[row] = make_label(target_location)
+            self.next_row += 1
+            return row
+
+    def flush(self):
+        """Write the appended frames to disk. Their rows are already counted in `meta.json`."""
+
+        with self.lock:
+            self.images.flush()
+            self.labels.flush()
+
+    def close(self):
+        """Flush, and give back the unused rows of the last block if no other writer took rows after them."""
+
+        self.flush()
+        with self.lock, self._locked():
+            self._load_meta()
+            if self.count == self.block_end and self.next_row < self.block_end:
+                self.count = self.next_row
+                self._save_meta()
+            self.block_end = self.next_row
+        os.close(self.lock_fd)
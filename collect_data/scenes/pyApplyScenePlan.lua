@@ -0,0 +1,79 @@
+-- Add this function to the child script of the `RemotePyApi` object of the scene
+-- (next to pySetLights, pyObjRotation, pyCreateTexture, pySetTexture, pySetColor and pyRemoveObj).
+--
+-- It applies a scene plan packed by `collect_data/random_env/scene_plan.py` and returns the camera image:
+--   inInts:    {camera handle}
+--   inStrings: texture file paths referenced by CREATE_TEXTURE commands
+--   inBuffer:  fixed-size records '<i4 i4 i4 i4 i4 i4 i4 f f f f' (opcode, 6 ints, 4 floats)
+-- returns {resX, resY}, {}, {}, image (RGB, bottom row first)
+
+SET_POSITION = 1
+SET_ORIENTATION = 2
+ROTATE = 3
+SET_LIGHT = 4
+CREATE_TEXTURE = 5
+SET_TEXTURE = 6
+SET_COLOR = 7
+
+RECORD_FORMAT = '<i4i4i4i4i4i4i4ffff'
+
+pyApplyScenePlan = function(inInts, inFloats, inStrings, inBuffer)
+    local camera = inInts[1]
+    local axes = {'x', 'y', 'z'}
+    local textures = {}
+    local recordSize = string.packsize(RECORD_FORMAT)
+
+    for pos = 1, #inBuffer - recordSize + 1, recordSize do
+        local op, i1, i2, i3, i4, i5, i6, f1, f2, f3, f4 = string.unpack(RECORD_FORMAT, inBuffer, pos)
+        if op == SET_POSITION then
+            sim.setObjectPosition(i1, i2, {f1, f2, f3})
+        elseif op == SET_ORIENTATION then
+            sim.setObjectOrientation(i1, i2, {f1, f2, f3})
+        elseif op == ROTATE then
+            pyObjRotation({i1}, {f1}, {axes[i2 + 1]}, '')
+        elseif op == SET_LIGHT then
+            if i1 == 0 then
+                pySetLights({0, i2}, {}, {}, '')
+            else
+                pySetLights({1, i2}, {f1, f2, f3}, {}, '')
+            end
+        elseif op == CREATE_TEXTURE then
+            -- fall back to the next texture of the plan when a file cannot be loaded
+            local textureId = -1
+            for k = 0, #inStrings - 1 do
+                local path = inStrings[(i1 + k) % #inStrings + 1]
+                local outInts = pyCreateTexture({i2, i3, i4}, {}, {path}, '')
+                textureId = outInts[1]
+                if textureId ~= -1 then
+                    break
+                end
+            end
+            textures[#textures + 1] = textureId
+        elseif op == SET_TEXTURE then
+            local texture = -1
+            if i2 ~= -1 then
+                texture = textures[i2 + 1]
+            end
+            pySetTexture({i1, texture, i3, i4, i5, i6}, {f1, f2, f3}, {}, '')
+        elseif op == SET_COLOR then
+            pySetColor({i1}, {f1, f2, f3, f4}, {}, '')
+        end
+    end
+
+    sim.handleVisionSensor(camera)
+    local image, resX, resY = sim.getVisionSensorCharImage(camera)
+
+    -- remove the planes generated by pyCreateTexture, as Texture.delete_texture does
+    for k = 1, #textures do
+        local name = 'Plane'
+        if k > 1 then
+            name = 'Plane' .. (k - 2)
+        end
+        local handle = sim.getObjectHandle(name .. '@silentError')
+        if handle ~= -1 then
+            pyRemoveObj({handle}, {}, {}, '')
+        end
+    end
+
+    return {resX, resY}, {}, {}, image
+end
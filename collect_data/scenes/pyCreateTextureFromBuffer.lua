@@ -0,0 +1,20 @@
+-- Add this function to the child script of the `RemotePyApi` object of the scene (next to pyCreateTexture).
+--
+-- It creates a texture from raw pixels sent by `Texture._create_procedural_texture`, without any file:
+--   inInts:   {mapping mode, resX, resY}, as for pyCreateTexture
+--   inBuffer: resX * resY RGB pixels, 3 bytes each
+-- returns {texture id}, -1 when the texture could not be created.
+-- Like pyCreateTexture, it generates a plane named 'Plane', 'Plane0', ... that holds the texture.
+
+pyCreateTextureFromBuffer = function(inInts, inFloats, inStrings, inBuffer)
+    local resolution = {inInts[2], inInts[3]}
+    if #inBuffer ~= resolution[1] * resolution[2] * 3 then
+        return {-1}, {}, {}, ''
+    end
+    local shape, textureId = sim.createTexture('', inInts[1], nil, nil, nil, 0, resolution)
+    if textureId == -1 then
+        return {-1}, {}, {}, ''
+    end
+    sim.writeTexture(textureId, 0, inBuffer, 0, 0, resolution[1], resolution[2], 0)
+    return {textureId}, {}, {}, ''
+end
@@ -0,0 +1,20 @@
+-- Add these functions to the child script of the `RemotePyApi` object of the scene,
+-- for the render-only collection mode of `RandomEnv`.
+
+-- Switch the explicit handling of a vision sensor on or off: explicitly handled sensors are only
+-- rendered when sim.handleVisionSensor is called for them, not by the main script.
+--   inInts: {sensor handle, 1 to handle it explicitly or 0}
+pySetExplicitHandling = function(inInts, inFloats, inStrings, inBuffer)
+    sim.setExplicitHandling(inInts[1], inInts[2])
+    return {}, {}, {}, ''
+end
+
+-- Render a vision sensor once and return its image.
+--   inInts: {sensor handle}
+-- returns {resX, resY}, {}, {}, image (RGB, bottom row first)
+pyRenderCamera = function(inInts, inFloats, inStrings, inBuffer)
+    local camera = inInts[1]
+    sim.handleVisionSensor(camera)
+    local image, resX, resY = sim.getVisionSensorCharImage(camera)
+    return {resX, resY}, {}, {}, image
+end
@@ -1,4 +1,5 @@
 from vrep import vrep_env
+from vrep.shell import read_endpoints
 import numpy as np
 import os
 
@@ -21,6 +22,8 @@ class Demo(vrep_env.VrepEnv):
         joint_names = ['UR5_joint' + str(i + 1) for i in range(6)]
         self.handle_joints = list(map(self.get_object_handle, joint_names))
         self.handle_camera = self.get_object_handle('Camera')
+        for handle in self.handle_joints:
+            self.subscribe('joint_angle', handle)
 
         self.handle_target = self.get_object_handle("Target")
 
@@ -79,7 +82,8 @@ class Demo(vrep_env.VrepEnv):
         """
         radian_action = []
         for i in range(6):
-            radian_action.append(self.obj_get_joint_angle(self.handle_joints[i]))
+            angle, _ = self.read_subscribed('joint_angle', self.handle_joints[i])
+            radian_action.append(angle)
         return radian_action
 
     def set_pose(self, pose):
@@ -165,9 +169,12 @@ class Demo(vrep_env.VrepEnv):
 
 def main():
     scene_file = 'UR5_demo.ttt'
-    server_port = 19997
+    server_addr, server_port = '127.0.0.1', 19997
+    endpoints = read_endpoints()
+    if endpoints:
+        server_addr, server_port = endpoints[0]
 
-    env = [Demo(server_port=server_port,
+    env = [Demo(server_addr=server_addr, server_port=server_port,
                 scene_directory='/home/zoker/COMP6445/Group_project/demo/scenes',
                 scene_file=scene_file)]
     env[0].reset()
@@ -1,34 +1,92 @@
+import io
 import json
 import torch
 import numpy as np
 import os
 import PIL
 from PIL import Image
+from data.shards import list_shards, read_index, iter_shard
+from data.manifest import has_manifest, read_manifest
+from data.tensor_store import open_store, MemmapImages
 
 
 def is_json(f):
     return f.endswith('json')
 
 
+def _read_files(path, file_list):
+    for fn in file_list:
+        with open(fn) as f:
+            data = json.load(f)
+        yield data, Image.open(os.path.join(path, data['image_path']))
+
+
+def _read_shards(shards):
+    for shard in shards:
+        for data, image in iter_shard(shard):
+            yield data, Image.open(io.BytesIO(image))
+
+
+def _read_manifest_records(path, directory, records):
+    shards = {}
+    try:
+        for data in records:
+            if 'shard' not in data:
+                yield data, Image.open(os.path.join(path, data['image_path']))
+                continue
+            if data['shard'] not in shards:
+                shards[data['shard']] = open(os.path.join(directory, data['shard']), 'rb')
+            f = shards[data['shard']]
+            offset, size = data['image']
+            f.seek(offset)
+            yield data, Image.open(io.BytesIO(f.read(size)))
+    finally:
+        for f in shards.values():
+            f.close()
+
+
+def list_samples(path, dir, **where):
+    """Find the samples of a dataset, from its manifest, or written as separate files or as shards.
+
+    :param where: Only keep the samples whose records have these values, e.g. `version=1`.
+        Needs a manifest.
+    :return: num, samples
+
+    `samples` is a generator of (record, image) pairs, `image` being a PIL image.
+    Without a manifest, shards are read sequentially, one after the other, and files are found by listing
+    the directory.
+    """
+
+    if has_manifest(path + dir):
+        records = read_manifest(path + dir, **where)
+        return len(records), _read_manifest_records(path, path + dir, records)
+    assert not where, 'filtering the samples needs a manifest'
+
+    shards = list_shards(path + dir)
+    if shards:
+        num = sum(len(read_index(shard)) for shard in shards)
+        return num, _read_shards(shards)
+
+    file_list = os.listdir(path + dir)
+    file_list = filter(is_json, file_list)
+    file_list = [os.path.join(path + dir, f) for f in file_list]
+    file_list.sort()
+    return len(file_list), _read_files(path, file_list)
+
+
 def make_dataset(path, dir, val_ratio=0.05):
     train_img = []
     train_y = []
     test_img = []
     test_y = []
 
-    file_list = os.listdir(path + dir)
-    file_list = filter(is_json, file_list)
-    file_list = [os.path.join(path + dir, f) for f in file_list]
-    file_list.sort()
-    print('There are {} samples'.format(len(file_list)))
+    num, samples = list_samples(path, dir)
+    print('There are {} samples'.format(num))
 
     num_training_sample = 0
     num_testing_sample = 0
-    for i, fn in enumerate(file_list):
-        with open(fn) as f:
-            data = json.load(f)
-        img = Image.open(os.path.join(path, data['image_path']))
-        img = img.resize((224, 224), PIL.Image.ANTIALIAS)
+    for i, (data, img) in enumerate(samples):
+        img = img.convert('RGB').resize((224, 224), PIL.Image.ANTIALIAS)
         img = np.asarray(img)
         img = img.reshape([3, 224, 224])
         target_location = data['target_location']
@@ -38,7 +96,7 @@ def make_dataset(path, dir, val_ratio=0.05):
         else:
             label = 1
 
-        if i > len(file_list) * val_ratio:
+        if i > num * val_ratio:
             train_img.append(img)
             train_y.append([label, target_location[0], target_location[1]])
             num_training_sample += 1
@@ -54,6 +112,29 @@ def make_dataset(path, dir, val_ratio=0.05):
     return train_x, train_y, test_x, test_y
 
 
+def make_memmap_dataset(path, dir, val_ratio=0.05, store='tensors'):
+    """Same split as `make_dataset`, from the tensor store written by the collector.
+
+    The images are not loaded: `train_x` and `test_x` are `MemmapImages` that read a batch
+    from the memory-mapped frames when it is indexed. The labels are float tensors.
+    With a manifest, only the rows of its records are used: the rows of a collection range that
+    failed and was collected again are left out. Without one, the rows taken by a writer but never
+    written, which have a NaN label, are left out.
+    """
+
+    images, labels = open_store(os.path.join(path + dir, store))
+    rows = np.flatnonzero(~np.isnan(labels[:, 0]))
+    if has_manifest(path + dir):
+        rows = np.array([r['store_row'] for r in read_manifest(path + dir) if r.get('store_row') is not None],
+                        dtype=np.int64)
+    print('There are {} samples'.format(len(rows)))
+    split = int(len(rows) * val_ratio) + 1
+    test_x, train_x = MemmapImages(images, rows[:split]), MemmapImages(images, rows[split:])
+    test_y = torch.from_numpy(np.array(labels[rows[:split]]))
+    train_y = torch.from_numpy(np.array(labels[rows[split:]]))
+    return train_x, train_y, test_x, test_y
+
+
 if __name__ == '__main__':
     path = '/home/zoker/COMP6445/Group_project/collect_data'
     dir = '/random_dataset_V0'
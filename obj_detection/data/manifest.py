@@ -0,0 +1,38 @@
+import json
+import os
+
+# Written by `collect_data/random_env/recorder.py`: one JSON line per sample, appended once the sample is on disk.
+MANIFEST_FILE = 'manifest.jsonl'
+
+
+def has_manifest(directory):
+    return os.path.exists(os.path.join(directory, MANIFEST_FILE))
+
+
+def read_manifest(directory, **where):
+    """Read the records of a dataset from its manifest in one sequential pass.
+
+    :param directory: Directory of the dataset.
+    :param where: Only keep the records whose fields have these values, e.g. `version=1` or `step_num=3`.
+    :return: records
+
+    `records` is a list of dicts in the order the samples were written. Records of samples in a shard also
+    have `shard` and the `image` [offset, size] of the encoded image in it. A line cut by an interrupted
+    collector is skipped; the other collectors may have appended lines after it. When several records have the same `sample_id`, the range was collected again and
+    only the last record is kept.
+    """
+
+    records = []
+    latest = {}
+    with open(os.path.join(directory, MANIFEST_FILE)) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get('sample_id') is not None:
+                latest[record['sample_id']] = len(records)
+            records.append(record)
+    return [r for i, r in enumerate(records)
+            if (r.get('sample_id') is None or latest[r['sample_id']] == i)
+            and all(r.get(k) == v for k, v in where.items())]
@@ -0,0 +1,80 @@
+import json
+import os
+import tarfile
+
+# Shards written by `collect_data/random_env/shards.py`: `<name>.tar` holds `<id>.json` and the image of
+# every sample, `<name>.idx` has one JSON line per sample with the offset and size of both in the tar file.
+SHARD_EXT = '.tar'
+INDEX_EXT = '.idx'
+
+
+def list_shards(directory):
+    """Return the paths of the shards of a directory that have an index, in the order they were written."""
+
+    names = sorted(f for f in os.listdir(directory) if f.endswith(SHARD_EXT))
+    shards = [os.path.join(directory, f) for f in names]
+    return [f for f in shards if os.path.exists(os.path.splitext(f)[0] + INDEX_EXT)]
+
+
+def read_index(shard_path):
+    """Return the index entries of a shard. A last line cut by an interrupted collection is skipped."""
+
+    entries = []
+    with open(os.path.splitext(shard_path)[0] + INDEX_EXT) as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                break
+    return entries
+
+
+class ShardReader(object):
+    """Read any sample of a shard with one seek, through its index."""
+
+    def __init__(self, shard_path):
+        self.entries = read_index(shard_path)
+        self.file = open(shard_path, 'rb')
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _read(self, offset, size):
+        self.file.seek(offset)
+        return self.file.read(size)
+
+    def read(self, i):
+        """Return the record and the encoded image of sample `i`.
+
+        :return: record, image
+        """
+
+        entry = self.entries[i]
+        record = json.loads(self._read(*entry['json']).decode('utf-8'))
+        return record, self._read(*entry['image'])
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def iter_shard(shard_path):
+    """Read the samples of a shard in one sequential pass.
+
+    :return: A generator of (record, image) pairs, `image` being the encoded image.
+    """
+
+    record = None
+    with tarfile.open(shard_path, 'r|') as tar:
+        for member in tar:
+            data = tar.extractfile(member).read()
+            if member.name.endswith('.json'):
+                record = json.loads(data.decode('utf-8'))
+            elif record is not None:
+                yield record, data
+                record = None
@@ -0,0 +1,59 @@
+import json
+import os
+import numpy as np
+import torch
+
+# Written by `collect_data/random_env/tensor_store.py`: raw arrays of which the first `count` rows are taken by
+# the writers. A taken row that was never written has a NaN label.
+IMAGES_FILE = 'images.u8'
+LABELS_FILE = 'labels.f4'
+META_FILE = 'meta.json'
+LABEL_COLUMNS = 3
+
+
+def open_store(directory):
+    """Memory-map the frames and labels of a tensor store, read-only.
+
+    :return: images, labels
+
+    `images` is a uint8 numpy memmap of shape (N, 3, size, size), `labels` a float32 one of shape (N, 3)
+    holding the label and the target location of every frame.
+    """
+
+    with open(os.path.join(directory, META_FILE)) as f:
+        meta = json.load(f)
+    count, capacity = meta['count'], meta['capacity']
+    images = np.memmap(os.path.join(directory, IMAGES_FILE), dtype=np.uint8, mode='r',
+                       shape=(capacity,) + tuple(meta['image_shape']))
+    labels = np.memmap(os.path.join(directory, LABELS_FILE), dtype=np.float32, mode='r',
+                       shape=(capacity, LABEL_COLUMNS))
+    return images[:count], labels[:count]
+
+
+class MemmapImages(object):
+    """Frames of a tensor store that are read from disk only when a batch is indexed.
+
+    It behaves like the float tensors of `make_dataset` for the training loop: `size()` and
+    indexing with a tensor of indices, which returns a float tensor. With `rows`, only these rows
+    of `images` are used, in this order.
+    """
+
+    def __init__(self, images, rows=None):
+        self.images = images
+        self.rows = None if rows is None else np.asarray(rows)
+
+    def size(self):
+        return torch.Size((len(self),) + self.images.shape[1:])
+
+    def __len__(self):
+        return len(self.images) if self.rows is None else len(self.rows)
+
+    def __getitem__(self, indices):
+        indices = np.asarray(indices)
+        if self.rows is not None:
+            indices = self.rows[indices]
+        # read the rows in file order, then put them back in the requested order
+        order = np.argsort(indices)
+        batch = np.empty((len(indices),) + self.images.shape[1:], dtype=np.uint8)
+        batch[order] = self.images[indices[order]]
+        return torch.from_numpy(batch).float()
@@ -9,22 +9,77 @@ cfg = {
     'MYVGG': [32, 32, 'M', 64, 64, 'M', 128, 128, 128, 'M', 256, 256, 256, 'M', 256, 256, 256]
 }
 
+# Regression heads placed on top of the convolutional features.
+# 'gap': global average pooling followed by a small MLP.
+# 'spatial_softmax': per-channel expected (x, y) keypoints followed by a small MLP.
+head_cfg = {
+    'gap': {'type': 'gap', 'hidden': [256]},
+    'spatial_softmax': {'type': 'spatial_softmax', 'hidden': [256]},
+}
+
+
+def _make_mlp(in_features, hidden, out_features):
+    layers = []
+    for h in hidden:
+        layers += [nn.Linear(in_features, h), nn.ReLU(inplace=True)]
+        in_features = h
+    layers += [nn.Linear(in_features, out_features)]
+    return nn.Sequential(*layers)
+
+
+class GAPHead(nn.Module):
+    """Global average pooling followed by an MLP."""
+
+    def __init__(self, in_channels, hidden, out_features=3):
+        super(GAPHead, self).__init__()
+        self.pool = nn.AdaptiveAvgPool2d(1)
+        self.mlp = _make_mlp(in_channels, hidden, out_features)
+
+    def forward(self, x):
+        out = self.pool(x)
+        out = torch.flatten(out, 1)
+        return self.mlp(out)
+
+
+class SpatialSoftmaxHead(nn.Module):
+    """Spatial softmax over every feature channel, then an MLP on the expected (x, y) keypoints.
+
+    The keypoints are in normalized image coordinates [-1, 1], which keeps the head
+    independent of the feature map resolution.
+    """
+
+    def __init__(self, in_channels, hidden, out_features=3):
+        super(SpatialSoftmaxHead, self).__init__()
+        self.mlp = _make_mlp(2 * in_channels, hidden, out_features)
+
+    def forward(self, x):
+        n, c, h, w = x.size()
+        attention = torch.softmax(x.view(n, c, h * w), dim=2).view(n, c, h, w)
+        pos_x = torch.linspace(-1., 1., w, device=x.device, dtype=x.dtype)
+        pos_y = torch.linspace(-1., 1., h, device=x.device, dtype=x.dtype)
+        expected_x = (attention.sum(dim=2) * pos_x).sum(dim=2)
+        expected_y = (attention.sum(dim=3) * pos_y).sum(dim=2)
+        out = torch.cat([expected_x, expected_y], dim=1)
+        return self.mlp(out)
+
+
+_heads = {
+    'gap': GAPHead,
+    'spatial_softmax': SpatialSoftmaxHead,
+}
+
 
 class VGG(nn.Module):
-    def __init__(self, vgg_name):
+    def __init__(self, vgg_name, head='gap'):
         super(VGG, self).__init__()
         self.features = self._make_layers(cfg[vgg_name])
-        self.linear = nn.Linear(50176, 50176)
-        self.linear_out = nn.Linear(50176, 3)
+        out_channels = [x for x in cfg[vgg_name] if x != 'M'][-1]
+        head = head_cfg[head]
+        self.head = _heads[head['type']](out_channels, head['hidden'], 3)
 
     def forward(self, x):
         out = self.features(x)
-        out = torch.flatten(out, 1)
-        out = self.linear(out)
-        out = torch.relu(out)
-        out = self.linear(out)
-        out = torch.relu(out)
-        out = self.linear_out(out)
+        out = self.head(out)
 
         return out
 
@@ -42,9 +97,54 @@ class VGG(nn.Module):
                 in_channels = x
         return nn.Sequential(*layers)
 
+    def num_parameters(self, trainable_only=False):
+        """Count the parameters of the model.
+
+        :param trainable_only: Only count parameters that require grad.
+        :type trainable_only: bool
+        :return: The number of parameters.
+        """
+
+        return sum(p.numel() for p in self.parameters() if p.requires_grad or not trainable_only)
+
+    def macs(self, input_size=(3, 224, 224)):
+        """Count the multiply-accumulate operations of the conv and linear layers for one frame.
+
+        :param input_size: Size (C, H, W) of one input frame.
+        :type input_size: tuple
+        :return: The number of multiply-accumulates.
+        """
+
+        total = [0]
+
+        def conv_hook(module, inputs, output):
+            kernel = module.kernel_size[0] * module.kernel_size[1] * module.in_channels // module.groups
+            total[0] += output.numel() * kernel
+
+        def linear_hook(module, inputs, output):
+            total[0] += output.numel() * module.in_features
+
+        hooks = []
+        for m in self.modules():
+            if isinstance(m, nn.Conv2d):
+                hooks.append(m.register_forward_hook(conv_hook))
+            elif isinstance(m, nn.Linear):
+                hooks.append(m.register_forward_hook(linear_hook))
+        training = self.training
+        self.eval()
+        with torch.no_grad():
+            self(torch.zeros(1, *input_size, device=next(self.parameters()).device))
+        self.train(training)
+        for h in hooks:
+            h.remove()
+        return total[0]
+
 
 if __name__ == "__main__":
-    net = VGG('MYVGG')
-    x = torch.randn(5, 3, 224, 224)
-    y = net(x)
-    print(y.size())
+    for head in head_cfg:
+        net = VGG('MYVGG', head)
+        x = torch.randn(5, 3, 224, 224)
+        y = net(x)
+        print(head, y.size())
+        print('  parameters: {:,} ({:.1f} MB float32)'.format(net.num_parameters(), net.num_parameters() * 4 / 2 ** 20))
+        print('  MACs per frame: {:,}'.format(net.macs()))
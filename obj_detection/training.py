@@ -1,16 +1,21 @@
 import numpy as np
 from networks.VGG import VGG
-from data.data_loader import make_dataset
+from data.data_loader import make_dataset, make_memmap_dataset
 import torch
 from tqdm import tqdm
 
 
-def train_model(path, dir, n_epochs, model_name, learning_rate=0.0001, batch_size=128, val_ratio=0.05, use_gpu=False):
+def train_model(path, dir, n_epochs, model_name, learning_rate=0.0001, batch_size=128, val_ratio=0.05, use_gpu=False, head='gap',
+                memmap=False):
     print("Making dataset...")
-    train_x, train_y, test_x, test_y = make_dataset(path, dir, val_ratio)
+    if memmap:
+        train_x, train_y, test_x, test_y = make_memmap_dataset(path, dir, val_ratio)
+    else:
+        train_x, train_y, test_x, test_y = make_dataset(path, dir, val_ratio)
     print("DONE")
 
-    model = VGG('MYVGG')
+    model = VGG('MYVGG', head)
+    print('Model parameters: {}, MACs per frame: {}'.format(model.num_parameters(), model.macs()))
     optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate)
     criterion_label = torch.nn.MSELoss()
     criterion_position = torch.nn.L1Loss()
@@ -0,0 +1,39 @@
+from collect_data.random_env import procedural_texture
+
+
+def _count_generations(monkeypatch):
+    calls = []
+    generate = procedural_texture.generate
+
+    def counting(*args, **kwargs):
+        calls.append(1)
+        return generate(*args, **kwargs)
+
+    monkeypatch.setattr(procedural_texture, 'generate', counting)
+    return calls
+
+
+def test_refresh_amortizes_generation(monkeypatch):
+    calls = _count_generations(monkeypatch)
+    ring = procedural_texture.TextureRing(size=8, resolution=(32, 32), refresh=4, seed=0)
+    del calls[:]
+    for _ in range(100):
+        ring.next()
+    assert len(calls) / 100. < 1
+    assert len(calls) == 25
+
+
+def test_ring_keeps_changing():
+    ring = procedural_texture.TextureRing(size=4, resolution=(32, 32), refresh=1, seed=0)
+    first = [ring.next() for _ in range(4)]
+    second = [ring.next() for _ in range(4)]
+    assert all(a is not b for a, b in zip(first, second))
+
+
+def test_frozen_ring(monkeypatch):
+    calls = _count_generations(monkeypatch)
+    ring = procedural_texture.TextureRing(size=4, resolution=(32, 32), refresh=0, seed=0)
+    del calls[:]
+    for _ in range(20):
+        ring.next()
+    assert not calls
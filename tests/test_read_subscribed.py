@@ -0,0 +1,63 @@
+from vrep import vrep_env
+
+
+class FakeSim(object):
+    """Stands in for `vrep.sim`: a position stream whose buffer stops updating after `stall`."""
+
+    simx_return_ok = 0
+    simx_return_novalue_flag = 1
+
+    def __init__(self, stall):
+        self.stall = stall
+        self.time = 0
+        self.blocking_reads = 0
+
+    def simxGetLastCmdTime(self, cid):
+        return self.time
+
+    def simxGetObjectPosition(self, cid, handle, rel, mode):
+        if mode == vrep_env.BLOCKING:
+            self.blocking_reads += 1
+            return self.simx_return_ok, [float(self.time), 0., 0.]
+        if mode == vrep_env.BUFFER:
+            return self.simx_return_ok, [float(min(self.time, self.stall)), 0., 0.]
+        return self.simx_return_novalue_flag, [0., 0., 0.]
+
+
+def test_stalled_buffer_is_stale(monkeypatch):
+    fake = FakeSim(stall=100)
+    monkeypatch.setattr(vrep_env, 'sim', fake)
+    env = vrep_env.VrepEnv(session=vrep_env.SimSession(cid=0))
+
+    for fake.time in range(0, 101, 50):
+        value, timestamp = env.read_subscribed('position', 1, max_age=50)
+        assert timestamp == fake.time
+    reads = fake.blocking_reads
+
+    # the stream stops: the buffer keeps returning the value of t=100
+    fake.time = 130
+    value, timestamp = env.read_subscribed('position', 1, max_age=50)
+    assert (value[0], timestamp) == (100., 100)
+    assert fake.blocking_reads == reads
+
+    fake.time = 200
+    value, timestamp = env.read_subscribed('position', 1, max_age=50)
+    assert (value[0], timestamp) == (200., 200)
+    assert fake.blocking_reads == reads + 1
+
+
+def test_failed_refresh_keeps_value(monkeypatch):
+    fake = FakeSim(stall=100)
+    monkeypatch.setattr(vrep_env, 'sim', fake)
+    env = vrep_env.VrepEnv(session=vrep_env.SimSession(cid=0))
+
+    fake.time = 100
+    assert env.read_subscribed('position', 1, max_age=50) == ([100., 0., 0.], 100)
+
+    # the stream stalled and the blocking refresh fails too
+    fake.time = 200
+    monkeypatch.setattr(fake, 'simxGetObjectPosition',
+                        lambda cid, handle, rel, mode: (fake.simx_return_novalue_flag, [0., 0., 0.])
+                        if mode == vrep_env.BLOCKING else (fake.simx_return_ok, [100., 0., 0.]))
+    assert env.read_subscribed('position', 1, max_age=50) == ([100., 0., 0.], 100)
+    assert env.session.subscriptions[('position', 1, -1)]['misses'] == 1
@@ -1,10 +1,315 @@
+from vrep import sim
+import argparse
+import json
+import os
+import signal
 import subprocess
 import sys
+import threading
+import time
 
 vrep_path = '/home/zoker/CoppeliaSim'
-# server_port = sys.argv[1]
-server_port = '19997'
+# Endpoints of the running pool, read by the collection and demo drivers (see `read_endpoints`).
+ENDPOINTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sim_endpoints.json')
 
-command1 = "cd {} && ./coppeliaSim.sh -gREMOTEAPISERVERSERVICE_".format(vrep_path) + server_port + "_FALSE_TRUE "
 
-com1 = subprocess.Popen(command1, shell=True)
\ No newline at end of file
+def simulator_command(vrep_path, server_port, headless=True):
+    """Command line of a V-Rep instance serving the remote API on `server_port`."""
+
+    command = [os.path.join(vrep_path, 'coppeliaSim.sh')]
+    if headless:
+        command.append('-h')
+    command.append('-gREMOTEAPISERVERSERVICE_{}_FALSE_TRUE'.format(server_port))
+    return command
+
+
+def ping(server_addr, server_port, timeout=1000):
+    """Whether a V-Rep instance answers on a port: connect, ping and disconnect.
+
+    A remote API port serves one client at a time, so an instance in use does not answer.
+    """
+
+    cid = sim.simxStart(server_addr, server_port, True, True, timeout, 5)
+    if cid == -1:
+        return False
+    ret, _ = sim.simxGetPingTime(cid)
+    sim.simxFinish(cid)
+    return ret == sim.simx_return_ok
+
+
+def read_endpoints(path=ENDPOINTS_FILE):
+    """Return the [address, port] of the ready instances of a pool, [] when no pool is running."""
+
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+class SimInstance(object):
+    def __init__(self, server_port):
+        self.server_port = server_port
+        self.process = None
+        self.ready = False
+        self.leased = False
+        self.last_seen = 0.
+        self.restarts = 0
+        # consecutive restarts that did not make the instance ready, and when to try again
+        self.failures = 0
+        self.retry_at = 0.
+        # being restarted by a `check`, which does not hold the lock while it waits for the instance
+        self.restarting = False
+
+
+class SimulatorPool(object):
+    """Headless V-Rep instances on consecutive ports, started, watched and restarted for the drivers.
+
+    An instance is ready once it answers `simxGetPingTime`. `check` restarts the instances whose process
+    died and, with a `hang_timeout`, the leased ones that sent no `heartbeat` for that long: a driver
+    holds the only connection of its instance, so the pool cannot ping it. An instance that does not
+    become ready after a restart is tried again by the next checks, waiting twice as long every time.
+    A restart does not hold the lock of the pool while the instance starts, so the drivers can lease,
+    release and report the other instances meanwhile.
+    """
+
+    def __init__(self, vrep_path=vrep_path, base_port=19997, num=1, server_addr='127.0.0.1', headless=True,
+                 ready_timeout=60., hang_timeout=None, endpoints_path=None, log_dir=None, retry_delay=5.,
+                 max_retry_delay=300.):
+        """
+        :param vrep_path: Directory of `coppeliaSim.sh`.
+        :param base_port: Port of the first instance, the next ones follow.
+        :param num: Number of instances.
+        :param ready_timeout: Seconds an instance has to become ready.
+        :param hang_timeout: Seconds without heartbeat after which a leased instance is restarted,
+            `None` to only restart instances that died.
+        :param endpoints_path: Keep the endpoints of the ready instances in this file, see `read_endpoints`.
+        :param log_dir: Directory of the output of the instances, discarded when `None`.
+        :param retry_delay: Seconds before restarting again an instance whose restart failed.
+        :param max_retry_delay: Longest wait between two restarts of a failing instance.
+        """
+
+        self.vrep_path = vrep_path
+        self.server_addr = server_addr
+        self.headless = headless
+        self.ready_timeout = ready_timeout
+        self.hang_timeout = hang_timeout
+        self.endpoints_path = endpoints_path
+        self.log_dir = log_dir
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.instances = [SimInstance(base_port + i) for i in range(num)]
+        self.lock = threading.RLock()
+        self.supervisor = None
+        self.stopping = threading.Event()
+
+    def _instance(self, server_port):
+        for instance in self.instances:
+            if instance.server_port == server_port:
+                return instance
+        raise KeyError(server_port)
+
+    def _launch(self, instance):
+        output = subprocess.DEVNULL
+        if self.log_dir is not None:
+            output = open(os.path.join(self.log_dir, 'sim_{}.log'.format(instance.server_port)), 'ab')
+        # own process group, so that the simulator started by the script is stopped with it
+        instance.process = subprocess.Popen(simulator_command(self.vrep_path, instance.server_port, self.headless),
+                                            cwd=self.vrep_path, stdout=output, stderr=subprocess.STDOUT,
+                                            start_new_session=True)
+        instance.ready = False
+
+    def _kill(self, instance, timeout=10.):
+        if instance.process is None:
+            return
+        if instance.process.poll() is None:
+            try:
+                os.killpg(instance.process.pid, signal.SIGTERM)
+                instance.process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                os.killpg(instance.process.pid, signal.SIGKILL)
+                instance.process.wait()
+            except ProcessLookupError:
+                pass
+        instance.process = None
+        instance.ready = False
+
+    def _wait_ready(self, instance):
+        deadline = time.time() + self.ready_timeout
+        while time.time() < deadline:
+            if instance.process.poll() is not None:
+                break
+            if ping(self.server_addr, instance.server_port):
+                instance.ready = True
+                instance.last_seen = time.time()
+                return True
+            time.sleep(0.5)
+        return False
+
+    def _restart(self, instance):
+        """Restart an instance and return whether it became ready."""
+
+        self._kill(instance)
+        instance.restarts += 1
+        self._launch(instance)
+        return self._wait_ready(instance)
+
+    def start(self):
+        """Start every instance and wait until they are all ready."""
+
+        with self.lock:
+            for instance in self.instances:
+                self._launch(instance)
+            for instance in self.instances:
+                if not self._wait_ready(instance) and not self._restart(instance):
+                    raise RuntimeError('V-Rep on port {} did not become ready in {} s.'.format(
+                        instance.server_port, self.ready_timeout))
+            self._write_endpoints()
+        return self.endpoints()
+
+    def endpoints(self):
+        """Return the (address, port) of the ready instances."""
+
+        with self.lock:
+            return [(self.server_addr, i.server_port) for i in self.instances if i.ready]
+
+    def acquire(self):
+        """Lease a ready instance that no driver uses, `None` if there is none.
+
+        :return: (address, port)
+        """
+
+        with self.lock:
+            for instance in self.instances:
+                if instance.ready and not instance.leased:
+                    instance.leased = True
+                    instance.last_seen = time.time()
+                    return self.server_addr, instance.server_port
+        return None
+
+    def is_ready(self, server_port):
+        with self.lock:
+            return self._instance(server_port).ready
+
+    def release(self, server_port):
+        with self.lock:
+            self._instance(server_port).leased = False
+
+    def heartbeat(self, server_port):
+        """Tell the pool that the driver of an instance is making progress."""
+
+        with self.lock:
+            self._instance(server_port).last_seen = time.time()
+
+    def check(self, restarted=None):
+        """Restart the instances that died, hang, or did not become ready after their last restart.
+
+        :param restarted: Queue that gets the port of every instance to restart, before it is restarted.
+        :return: The ports of the restarted instances, ready or not. Their drivers lost their connection.
+            An instance that is not ready (see `is_ready`) is restarted again by a later check.
+        """
+
+        due = []
+        with self.lock:
+            now = time.time()
+            for instance in self.instances:
+                if instance.restarting:
+                    continue
+                died = instance.process is None or instance.process.poll() is not None
+                hung = (instance.leased and self.hang_timeout is not None
+                        and now - instance.last_seen > self.hang_timeout)
+                if not (died or hung or not instance.ready) or now < instance.retry_at:
+                    continue
+                instance.restarting = True
+                instance.ready = False
+                due.append(instance)
+            if due:
+                self._write_endpoints()
+        for instance in due:
+            if restarted is not None:
+                restarted.put(instance.server_port)
+            ready = self._restart(instance)
+            with self.lock:
+                instance.restarting = False
+                if ready:
+                    instance.failures = 0
+                    self._write_endpoints()
+                    continue
+                instance.failures += 1
+                delay = min(self.retry_delay * 2 ** (instance.failures - 1), self.max_retry_delay)
+                instance.retry_at = time.time() + delay
+            print('V-Rep on port {} did not become ready in {} s, restarting it again in {} s'.format(
+                instance.server_port, self.ready_timeout, delay), file=sys.stderr)
+        return [instance.server_port for instance in due]
+
+    def _supervise(self, interval, restarted):
+        while not self.stopping.wait(interval):
+            try:
+                for server_port in self.check(restarted):
+                    if self.is_ready(server_port):
+                        print('restarted V-Rep on port {}'.format(server_port))
+            except Exception as e:
+                print('checking the simulators failed: {!r}'.format(e), file=sys.stderr)
+
+    def start_supervisor(self, interval=5., restarted=None):
+        """Call `check` every `interval` seconds from a background thread.
+
+        :param restarted: Queue that gets the port of every instance the supervisor restarts.
+        """
+
+        self.supervisor = threading.Thread(target=self._supervise, args=(interval, restarted), daemon=True)
+        self.supervisor.start()
+
+    def stop_supervisor(self):
+        """Stop restarting instances. A restart in progress finishes in the background."""
+
+        self.stopping.set()
+
+    def _write_endpoints(self):
+        if self.endpoints_path is None:
+            return
+        with open(self.endpoints_path + '.tmp', 'w') as f:
+            json.dump([list(e) for e in self.endpoints()], f)
+        os.replace(self.endpoints_path + '.tmp', self.endpoints_path)
+
+    def stop(self):
+        """Stop the supervisor and every instance."""
+
+        self.stopping.set()
+        if self.supervisor is not None:
+            self.supervisor.join()
+        with self.lock:
+            for instance in self.instances:
+                self._kill(instance)
+            if self.endpoints_path is not None and os.path.exists(self.endpoints_path):
+                os.remove(self.endpoints_path)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a pool of headless V-Rep instances.')
+    parser.add_argument('--vrep-path', default=vrep_path)
+    parser.add_argument('--base-port', type=int, default=19997)
+    parser.add_argument('--num', type=int, default=1, help='number of instances')
+    parser.add_argument('--gui', action='store_true', help='show the V-Rep window')
+    parser.add_argument('--log-dir', default=None)
+    args = parser.parse_args()
+
+    with SimulatorPool(args.vrep_path, args.base_port, args.num, headless=not args.gui,
+                       endpoints_path=ENDPOINTS_FILE, log_dir=args.log_dir) as pool:
+        print('V-Rep ready on {}'.format(pool.endpoints()))
+        pool.start_supervisor()
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
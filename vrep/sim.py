@@ -1,3 +1,4 @@
+import array
 import platform
 import struct
 import sys
@@ -6,140 +7,159 @@ import ctypes as ct
 from vrep.simConst import *
 
 #load library
+# The library and the function prototypes are resolved on first use, so that importing this module stays
+# cheap and works on machines without the simulator installed.
 libsimx = None
-try:
-    file_extension = '.so'
-    if platform.system() =='cli':
-        file_extension = '.dll'
-    elif platform.system() =='Windows':
-        file_extension = '.dll'
-    elif platform.system() == 'Darwin':
-        file_extension = '.dylib'
-    else:
+
+def _load_library():
+    global libsimx
+    if libsimx is None:
         file_extension = '.so'
-    libfullpath = os.path.join(os.path.dirname(__file__), 'remoteApi' + file_extension)
-    libsimx = ct.CDLL(libfullpath)
-except:
-    print ('----------------------------------------------------')
-    print ('The remoteApi library could not be loaded. Make sure')
-    print ('it is located in the same folder as "sim.py", or')
-    print ('appropriately adjust the file "sim.py"')
-    print ('----------------------------------------------------')
-    print ('')
+        if platform.system() =='cli':
+            file_extension = '.dll'
+        elif platform.system() =='Windows':
+            file_extension = '.dll'
+        elif platform.system() == 'Darwin':
+            file_extension = '.dylib'
+        else:
+            file_extension = '.so'
+        libfullpath = os.path.join(os.path.dirname(__file__), 'remoteApi' + file_extension)
+        try:
+            libsimx = ct.CDLL(libfullpath)
+        except OSError as e:
+            raise RuntimeError('The remoteApi library could not be loaded from "{}". Make sure it is located in '
+                               'the same folder as "sim.py", or appropriately adjust the file "sim.py"'.format(libfullpath)) from e
+    return libsimx
+
+class _LazyFunction(object):
+    '''
+    ctypes prototype of a remote API function, bound to the library the first time it is called.
+    '''
+
+    def __init__(self, name, restype, *argtypes):
+        self.name = name
+        self.restype = restype
+        self.argtypes = argtypes
+        self._func = None
+
+    def __call__(self, *args):
+        if self._func is None:
+            self._func = ct.CFUNCTYPE(self.restype, *self.argtypes)((self.name, _load_library()))
+        return self._func(*args)
 
 #ctypes wrapper prototypes
-c_GetJointPosition          = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)(("simxGetJointPosition", libsimx))
-c_SetJointPosition          = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_float, ct.c_int32)(("simxSetJointPosition", libsimx))
-c_GetJointMatrix            = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)(("simxGetJointMatrix", libsimx))
-c_SetSphericalJointMatrix   = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)(("simxSetSphericalJointMatrix", libsimx))
-c_SetJointTargetVelocity    = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_float, ct.c_int32)(("simxSetJointTargetVelocity", libsimx))
-c_SetJointTargetPosition    = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_float, ct.c_int32)(("simxSetJointTargetPosition", libsimx))
-c_GetJointForce             = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)(("simxGetJointForce", libsimx))
-c_GetJointMaxForce          = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)(("simxGetJointMaxForce", libsimx))
-c_SetJointForce             = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_float, ct.c_int32)(("simxSetJointMaxForce", libsimx))
-c_SetJointMaxForce          = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_float, ct.c_int32)(("simxSetJointMaxForce", libsimx))
-c_ReadForceSensor           = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_ubyte), ct.POINTER(ct.c_float), ct.POINTER(ct.c_float), ct.c_int32)(("simxReadForceSensor", libsimx))
-c_BreakForceSensor          = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32)(("simxBreakForceSensor", libsimx))
-c_ReadVisionSensor          = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_ubyte), ct.POINTER(ct.POINTER(ct.c_float)), ct.POINTER(ct.POINTER(ct.c_int32)), ct.c_int32)(("simxReadVisionSensor", libsimx))
-c_GetObjectHandle           = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetObjectHandle", libsimx))
-c_GetVisionSensorImage      = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_byte)), ct.c_ubyte, ct.c_int32)(("simxGetVisionSensorImage", libsimx))
-c_SetVisionSensorImage      = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_byte), ct.c_int32, ct.c_ubyte, ct.c_int32)(("simxSetVisionSensorImage", libsimx))
-c_GetVisionSensorDepthBuffer= ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_float)), ct.c_int32)(("simxGetVisionSensorDepthBuffer", libsimx))
-c_GetObjectChild            = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetObjectChild", libsimx))
-c_GetObjectParent           = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetObjectParent", libsimx))
-c_ReadProximitySensor       = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_ubyte), ct.POINTER(ct.c_float), ct.POINTER(ct.c_int32), ct.POINTER(ct.c_float), ct.c_int32)(("simxReadProximitySensor", libsimx))
-c_LoadModel                 = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_ubyte, ct.POINTER(ct.c_int32), ct.c_int32)(("simxLoadModel", libsimx))
-c_LoadUI                    = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_ubyte, ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_int32)), ct.c_int32)(("simxLoadUI", libsimx))
-c_LoadScene                 =  ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_ubyte, ct.c_int32)(("simxLoadScene", libsimx))
-c_StartSimulation           = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32)(("simxStartSimulation", libsimx))
-c_PauseSimulation           = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32)(("simxPauseSimulation", libsimx))
-c_StopSimulation            = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32)(("simxStopSimulation", libsimx))
-c_GetUIHandle               = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetUIHandle", libsimx))
-c_GetUISlider               = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetUISlider", libsimx))
-c_SetUISlider               = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.c_int32, ct.c_int32)(("simxSetUISlider", libsimx))
-c_GetUIEventButton          = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetUIEventButton", libsimx))
-c_GetUIButtonProperty       = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetUIButtonProperty", libsimx))
-c_SetUIButtonProperty       = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.c_int32, ct.c_int32)(("simxSetUIButtonProperty", libsimx))
-c_AddStatusbarMessage       = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_int32)(("simxAddStatusbarMessage", libsimx))
-c_AuxiliaryConsoleOpen      = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.POINTER(ct.c_int32), ct.POINTER(ct.c_float), ct.POINTER(ct.c_float), ct.POINTER(ct.c_int32), ct.c_int32)(("simxAuxiliaryConsoleOpen", libsimx))
-c_AuxiliaryConsoleClose     = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32)(("simxAuxiliaryConsoleClose", libsimx))
-c_AuxiliaryConsolePrint     = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_char), ct.c_int32)(("simxAuxiliaryConsolePrint", libsimx))
-c_AuxiliaryConsoleShow      = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_ubyte, ct.c_int32)(("simxAuxiliaryConsoleShow", libsimx))
-c_GetObjectOrientation      = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)(("simxGetObjectOrientation", libsimx))
-c_GetObjectQuaternion       = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)(("simxGetObjectQuaternion", libsimx))
-c_GetObjectPosition         = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)(("simxGetObjectPosition", libsimx))
-c_SetObjectOrientation      = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)(("simxSetObjectOrientation", libsimx))
-c_SetObjectQuaternion       = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)(("simxSetObjectQuaternion", libsimx))
-c_SetObjectPosition         = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)(("simxSetObjectPosition", libsimx))
-c_SetObjectParent           = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.c_ubyte, ct.c_int32)(("simxSetObjectParent", libsimx))
-c_SetUIButtonLabel          = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_char), ct.c_int32)(("simxSetUIButtonLabel", libsimx))
-c_GetLastErrors             = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_char)), ct.c_int32)(("simxGetLastErrors", libsimx))
-c_GetArrayParameter         = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)(("simxGetArrayParameter", libsimx))
-c_SetArrayParameter         = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)(("simxSetArrayParameter", libsimx))
-c_GetBooleanParameter       = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_ubyte), ct.c_int32)(("simxGetBooleanParameter", libsimx))
-c_SetBooleanParameter       = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_ubyte, ct.c_int32)(("simxSetBooleanParameter", libsimx))
-c_GetIntegerParameter       = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetIntegerParameter", libsimx))
-c_SetIntegerParameter       = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.c_int32)(("simxSetIntegerParameter", libsimx))
-c_GetFloatingParameter      = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)(("simxGetFloatingParameter", libsimx))
-c_SetFloatingParameter      = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_float, ct.c_int32)(("simxSetFloatingParameter", libsimx))
-c_GetStringParameter        = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.POINTER(ct.c_char)), ct.c_int32)(("simxGetStringParameter", libsimx))
-c_GetCollisionHandle        = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetCollisionHandle", libsimx))
-c_GetDistanceHandle         = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetDistanceHandle", libsimx))
-c_GetCollectionHandle       = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetCollectionHandle", libsimx))
-c_ReadCollision             = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_ubyte), ct.c_int32)(("simxReadCollision", libsimx))
-c_ReadDistance              = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)(("simxReadDistance", libsimx))
-c_CheckCollision            = ct.CFUNCTYPE(ct.c_int32,ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_ubyte), ct.c_int32)(("simxCheckCollision", libsimx))
-c_CheckDistance             = ct.CFUNCTYPE(ct.c_int32,ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)(("simxCheckDistance", libsimx))
-c_RemoveObject              = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32)(("simxRemoveObject", libsimx))
-c_RemoveModel               = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32)(("simxRemoveModel", libsimx))
-c_RemoveUI                  = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32)(("simxRemoveUI", libsimx))
-c_CloseScene                = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32)(("simxCloseScene", libsimx))
-c_GetObjects                = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_int32)), ct.c_int32)(("simxGetObjects", libsimx))
-c_DisplayDialog             = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_char), ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_float), ct.POINTER(ct.c_float), ct.POINTER(ct.c_int32), ct.POINTER(ct.c_int32), ct.c_int32)(("simxDisplayDialog", libsimx))
-c_EndDialog                 = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32)(("simxEndDialog", libsimx))
-c_GetDialogInput            = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.POINTER(ct.c_char)), ct.c_int32)(("simxGetDialogInput", libsimx))
-c_GetDialogResult           = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetDialogResult", libsimx))
-c_CopyPasteObjects          = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32, ct.POINTER(ct.POINTER(ct.c_int32)), ct.POINTER(ct.c_int32), ct.c_int32)(("simxCopyPasteObjects", libsimx))
-c_GetObjectSelection        = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.POINTER(ct.c_int32)), ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetObjectSelection", libsimx))
-c_SetObjectSelection        = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32, ct.c_int32)(("simxSetObjectSelection", libsimx))
-c_ClearFloatSignal          = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_int32)(("simxClearFloatSignal", libsimx))
-c_ClearIntegerSignal        = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_int32)(("simxClearIntegerSignal", libsimx))
-c_ClearStringSignal         = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_int32)(("simxClearStringSignal", libsimx))
-c_GetFloatSignal            = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_float), ct.c_int32)(("simxGetFloatSignal", libsimx))
-c_GetIntegerSignal          = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetIntegerSignal", libsimx))
-c_GetStringSignal           = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.POINTER(ct.c_ubyte)), ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetStringSignal", libsimx))
-c_SetFloatSignal            = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_float, ct.c_int32)(("simxSetFloatSignal", libsimx))
-c_SetIntegerSignal          = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_int32, ct.c_int32)(("simxSetIntegerSignal", libsimx))
-c_SetStringSignal           = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_ubyte), ct.c_int32, ct.c_int32)(("simxSetStringSignal", libsimx))
-c_AppendStringSignal        = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_ubyte), ct.c_int32, ct.c_int32)(("simxAppendStringSignal", libsimx))
-c_WriteStringStream         = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_ubyte), ct.c_int32, ct.c_int32)(("simxWriteStringStream", libsimx))
-c_GetObjectFloatParameter   = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)(("simxGetObjectFloatParameter", libsimx))
-c_SetObjectFloatParameter   = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.c_float, ct.c_int32)(("simxSetObjectFloatParameter", libsimx))
-c_GetObjectIntParameter     = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetObjectIntParameter", libsimx))
-c_SetObjectIntParameter     = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.c_int32, ct.c_int32)(("simxSetObjectIntParameter", libsimx))
-c_GetModelProperty          = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetModelProperty", libsimx))
-c_SetModelProperty          = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.c_int32)(("simxSetModelProperty", libsimx))
-c_Start                     = ct.CFUNCTYPE(ct.c_int32,ct.POINTER(ct.c_char), ct.c_int32, ct.c_ubyte, ct.c_ubyte, ct.c_int32, ct.c_int32)(("simxStart", libsimx))
-c_Finish                    = ct.CFUNCTYPE(None, ct.c_int32)(("simxFinish", libsimx))
-c_GetPingTime               = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_int32))(("simxGetPingTime", libsimx))
-c_GetLastCmdTime            = ct.CFUNCTYPE(ct.c_int32,ct.c_int32)(("simxGetLastCmdTime", libsimx))
-c_SynchronousTrigger        = ct.CFUNCTYPE(ct.c_int32,ct.c_int32)(("simxSynchronousTrigger", libsimx))
-c_Synchronous               = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_ubyte)(("simxSynchronous", libsimx))
-c_PauseCommunication        = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_ubyte)(("simxPauseCommunication", libsimx))
-c_GetInMessageInfo          = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32))(("simxGetInMessageInfo", libsimx))
-c_GetOutMessageInfo         = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32))(("simxGetOutMessageInfo", libsimx))
-c_GetConnectionId           = ct.CFUNCTYPE(ct.c_int32,ct.c_int32)(("simxGetConnectionId", libsimx))
-c_CreateBuffer              = ct.CFUNCTYPE(ct.POINTER(ct.c_ubyte), ct.c_int32)(("simxCreateBuffer", libsimx))
-c_ReleaseBuffer             = ct.CFUNCTYPE(None, ct.c_void_p)(("simxReleaseBuffer", libsimx))
-c_TransferFile              = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_char), ct.c_int32, ct.c_int32)(("simxTransferFile", libsimx))
-c_EraseFile                 = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_int32)(("simxEraseFile", libsimx))
-c_GetAndClearStringSignal   = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.POINTER(ct.c_ubyte)), ct.POINTER(ct.c_int32), ct.c_int32)(("simxGetAndClearStringSignal", libsimx))
-c_ReadStringStream          = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.POINTER(ct.c_ubyte)), ct.POINTER(ct.c_int32), ct.c_int32)(("simxReadStringStream", libsimx))
-c_CreateDummy               = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_float, ct.POINTER(ct.c_ubyte), ct.POINTER(ct.c_int32), ct.c_int32)(("simxCreateDummy", libsimx))
-c_Query                     = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_ubyte), ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.POINTER(ct.c_ubyte)), ct.POINTER(ct.c_int32), ct.c_int32)(("simxQuery", libsimx))
-c_GetObjectGroupData        = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_int32)), ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_int32)), ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_float)), ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_char)), ct.c_int32)(("simxGetObjectGroupData", libsimx))
-c_GetObjectVelocity         = ct.CFUNCTYPE(ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.POINTER(ct.c_float), ct.c_int32)(("simxGetObjectVelocity", libsimx))
-c_CallScriptFunction        = ct.CFUNCTYPE(ct.c_int32,ct.c_int32,ct.POINTER(ct.c_char),ct.c_int32,ct.POINTER(ct.c_char),ct.c_int32,ct.POINTER(ct.c_int32),ct.c_int32,ct.POINTER(ct.c_float),ct.c_int32,ct.POINTER(ct.c_char),ct.c_int32,ct.POINTER(ct.c_ubyte),ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_int32)),ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_float)),ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_char)),ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_ubyte)),ct.c_int32)(("simxCallScriptFunction", libsimx))
+c_GetJointPosition          = _LazyFunction("simxGetJointPosition", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)
+c_SetJointPosition          = _LazyFunction("simxSetJointPosition", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_float, ct.c_int32)
+c_GetJointMatrix            = _LazyFunction("simxGetJointMatrix", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)
+c_SetSphericalJointMatrix   = _LazyFunction("simxSetSphericalJointMatrix", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)
+c_SetJointTargetVelocity    = _LazyFunction("simxSetJointTargetVelocity", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_float, ct.c_int32)
+c_SetJointTargetPosition    = _LazyFunction("simxSetJointTargetPosition", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_float, ct.c_int32)
+c_GetJointForce             = _LazyFunction("simxGetJointForce", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)
+c_GetJointMaxForce          = _LazyFunction("simxGetJointMaxForce", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)
+c_SetJointForce             = _LazyFunction("simxSetJointMaxForce", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_float, ct.c_int32)
+c_SetJointMaxForce          = _LazyFunction("simxSetJointMaxForce", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_float, ct.c_int32)
+c_ReadForceSensor           = _LazyFunction("simxReadForceSensor", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_ubyte), ct.POINTER(ct.c_float), ct.POINTER(ct.c_float), ct.c_int32)
+c_BreakForceSensor          = _LazyFunction("simxBreakForceSensor", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32)
+c_ReadVisionSensor          = _LazyFunction("simxReadVisionSensor", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_ubyte), ct.POINTER(ct.POINTER(ct.c_float)), ct.POINTER(ct.POINTER(ct.c_int32)), ct.c_int32)
+c_GetObjectHandle           = _LazyFunction("simxGetObjectHandle", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_int32), ct.c_int32)
+c_GetVisionSensorImage      = _LazyFunction("simxGetVisionSensorImage", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_byte)), ct.c_ubyte, ct.c_int32)
+c_SetVisionSensorImage      = _LazyFunction("simxSetVisionSensorImage", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_byte), ct.c_int32, ct.c_ubyte, ct.c_int32)
+c_GetVisionSensorDepthBuffer= _LazyFunction("simxGetVisionSensorDepthBuffer", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_float)), ct.c_int32)
+c_GetObjectChild            = _LazyFunction("simxGetObjectChild", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32)
+c_GetObjectParent           = _LazyFunction("simxGetObjectParent", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32)
+c_ReadProximitySensor       = _LazyFunction("simxReadProximitySensor", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_ubyte), ct.POINTER(ct.c_float), ct.POINTER(ct.c_int32), ct.POINTER(ct.c_float), ct.c_int32)
+c_LoadModel                 = _LazyFunction("simxLoadModel", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_ubyte, ct.POINTER(ct.c_int32), ct.c_int32)
+c_LoadUI                    = _LazyFunction("simxLoadUI", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_ubyte, ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_int32)), ct.c_int32)
+c_LoadScene                 =  _LazyFunction("simxLoadScene", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_ubyte, ct.c_int32)
+c_StartSimulation           = _LazyFunction("simxStartSimulation", ct.c_int32,ct.c_int32, ct.c_int32)
+c_PauseSimulation           = _LazyFunction("simxPauseSimulation", ct.c_int32,ct.c_int32, ct.c_int32)
+c_StopSimulation            = _LazyFunction("simxStopSimulation", ct.c_int32,ct.c_int32, ct.c_int32)
+c_GetUIHandle               = _LazyFunction("simxGetUIHandle", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_int32), ct.c_int32)
+c_GetUISlider               = _LazyFunction("simxGetUISlider", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32)
+c_SetUISlider               = _LazyFunction("simxSetUISlider", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.c_int32, ct.c_int32)
+c_GetUIEventButton          = _LazyFunction("simxGetUIEventButton", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.POINTER(ct.c_int32), ct.c_int32)
+c_GetUIButtonProperty       = _LazyFunction("simxGetUIButtonProperty", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32)
+c_SetUIButtonProperty       = _LazyFunction("simxSetUIButtonProperty", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.c_int32, ct.c_int32)
+c_AddStatusbarMessage       = _LazyFunction("simxAddStatusbarMessage", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_int32)
+c_AuxiliaryConsoleOpen      = _LazyFunction("simxAuxiliaryConsoleOpen", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.POINTER(ct.c_int32), ct.POINTER(ct.c_float), ct.POINTER(ct.c_float), ct.POINTER(ct.c_int32), ct.c_int32)
+c_AuxiliaryConsoleClose     = _LazyFunction("simxAuxiliaryConsoleClose", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32)
+c_AuxiliaryConsolePrint     = _LazyFunction("simxAuxiliaryConsolePrint", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_char), ct.c_int32)
+c_AuxiliaryConsoleShow      = _LazyFunction("simxAuxiliaryConsoleShow", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_ubyte, ct.c_int32)
+c_GetObjectOrientation      = _LazyFunction("simxGetObjectOrientation", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)
+c_GetObjectQuaternion       = _LazyFunction("simxGetObjectQuaternion", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)
+c_GetObjectPosition         = _LazyFunction("simxGetObjectPosition", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)
+c_SetObjectOrientation      = _LazyFunction("simxSetObjectOrientation", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)
+c_SetObjectQuaternion       = _LazyFunction("simxSetObjectQuaternion", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)
+c_SetObjectPosition         = _LazyFunction("simxSetObjectPosition", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)
+c_SetObjectParent           = _LazyFunction("simxSetObjectParent", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.c_ubyte, ct.c_int32)
+c_SetUIButtonLabel          = _LazyFunction("simxSetUIButtonLabel", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_char), ct.c_int32)
+c_GetLastErrors             = _LazyFunction("simxGetLastErrors", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_char)), ct.c_int32)
+c_GetArrayParameter         = _LazyFunction("simxGetArrayParameter", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)
+c_SetArrayParameter         = _LazyFunction("simxSetArrayParameter", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)
+c_GetBooleanParameter       = _LazyFunction("simxGetBooleanParameter", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_ubyte), ct.c_int32)
+c_SetBooleanParameter       = _LazyFunction("simxSetBooleanParameter", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_ubyte, ct.c_int32)
+c_GetIntegerParameter       = _LazyFunction("simxGetIntegerParameter", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32)
+c_SetIntegerParameter       = _LazyFunction("simxSetIntegerParameter", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.c_int32)
+c_GetFloatingParameter      = _LazyFunction("simxGetFloatingParameter", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)
+c_SetFloatingParameter      = _LazyFunction("simxSetFloatingParameter", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_float, ct.c_int32)
+c_GetStringParameter        = _LazyFunction("simxGetStringParameter", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.POINTER(ct.c_char)), ct.c_int32)
+c_GetCollisionHandle        = _LazyFunction("simxGetCollisionHandle", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_int32), ct.c_int32)
+c_GetDistanceHandle         = _LazyFunction("simxGetDistanceHandle", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_int32), ct.c_int32)
+c_GetCollectionHandle       = _LazyFunction("simxGetCollectionHandle", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_int32), ct.c_int32)
+c_ReadCollision             = _LazyFunction("simxReadCollision", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_ubyte), ct.c_int32)
+c_ReadDistance              = _LazyFunction("simxReadDistance", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)
+c_CheckCollision            = _LazyFunction("simxCheckCollision", ct.c_int32,ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_ubyte), ct.c_int32)
+c_CheckDistance             = _LazyFunction("simxCheckDistance", ct.c_int32,ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)
+c_RemoveObject              = _LazyFunction("simxRemoveObject", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32)
+c_RemoveModel               = _LazyFunction("simxRemoveModel", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32)
+c_RemoveUI                  = _LazyFunction("simxRemoveUI", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32)
+c_CloseScene                = _LazyFunction("simxCloseScene", ct.c_int32,ct.c_int32, ct.c_int32)
+c_GetObjects                = _LazyFunction("simxGetObjects", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_int32)), ct.c_int32)
+c_DisplayDialog             = _LazyFunction("simxDisplayDialog", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_char), ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_float), ct.POINTER(ct.c_float), ct.POINTER(ct.c_int32), ct.POINTER(ct.c_int32), ct.c_int32)
+c_EndDialog                 = _LazyFunction("simxEndDialog", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32)
+c_GetDialogInput            = _LazyFunction("simxGetDialogInput", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.POINTER(ct.c_char)), ct.c_int32)
+c_GetDialogResult           = _LazyFunction("simxGetDialogResult", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32)
+c_CopyPasteObjects          = _LazyFunction("simxCopyPasteObjects", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32, ct.POINTER(ct.POINTER(ct.c_int32)), ct.POINTER(ct.c_int32), ct.c_int32)
+c_GetObjectSelection        = _LazyFunction("simxGetObjectSelection", ct.c_int32,ct.c_int32, ct.POINTER(ct.POINTER(ct.c_int32)), ct.POINTER(ct.c_int32), ct.c_int32)
+c_SetObjectSelection        = _LazyFunction("simxSetObjectSelection", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32, ct.c_int32)
+c_ClearFloatSignal          = _LazyFunction("simxClearFloatSignal", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_int32)
+c_ClearIntegerSignal        = _LazyFunction("simxClearIntegerSignal", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_int32)
+c_ClearStringSignal         = _LazyFunction("simxClearStringSignal", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_int32)
+c_GetFloatSignal            = _LazyFunction("simxGetFloatSignal", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_float), ct.c_int32)
+c_GetIntegerSignal          = _LazyFunction("simxGetIntegerSignal", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_int32), ct.c_int32)
+c_GetStringSignal           = _LazyFunction("simxGetStringSignal", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.POINTER(ct.c_ubyte)), ct.POINTER(ct.c_int32), ct.c_int32)
+c_SetFloatSignal            = _LazyFunction("simxSetFloatSignal", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_float, ct.c_int32)
+c_SetIntegerSignal          = _LazyFunction("simxSetIntegerSignal", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_int32, ct.c_int32)
+c_SetStringSignal           = _LazyFunction("simxSetStringSignal", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_ubyte), ct.c_int32, ct.c_int32)
+c_AppendStringSignal        = _LazyFunction("simxAppendStringSignal", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_ubyte), ct.c_int32, ct.c_int32)
+c_WriteStringStream         = _LazyFunction("simxWriteStringStream", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_ubyte), ct.c_int32, ct.c_int32)
+c_GetObjectFloatParameter   = _LazyFunction("simxGetObjectFloatParameter", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.c_int32)
+c_SetObjectFloatParameter   = _LazyFunction("simxSetObjectFloatParameter", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.c_float, ct.c_int32)
+c_GetObjectIntParameter     = _LazyFunction("simxGetObjectIntParameter", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32)
+c_SetObjectIntParameter     = _LazyFunction("simxSetObjectIntParameter", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.c_int32, ct.c_int32)
+c_GetModelProperty          = _LazyFunction("simxGetModelProperty", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.c_int32)
+c_SetModelProperty          = _LazyFunction("simxSetModelProperty", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.c_int32)
+c_Start                     = _LazyFunction("simxStart", ct.c_int32,ct.POINTER(ct.c_char), ct.c_int32, ct.c_ubyte, ct.c_ubyte, ct.c_int32, ct.c_int32)
+c_Finish                    = _LazyFunction("simxFinish", None, ct.c_int32)
+c_GetPingTime               = _LazyFunction("simxGetPingTime", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_int32))
+c_GetLastCmdTime            = _LazyFunction("simxGetLastCmdTime", ct.c_int32,ct.c_int32)
+c_SynchronousTrigger        = _LazyFunction("simxSynchronousTrigger", ct.c_int32,ct.c_int32)
+c_Synchronous               = _LazyFunction("simxSynchronous", ct.c_int32,ct.c_int32, ct.c_ubyte)
+c_PauseCommunication        = _LazyFunction("simxPauseCommunication", ct.c_int32,ct.c_int32, ct.c_ubyte)
+c_GetInMessageInfo          = _LazyFunction("simxGetInMessageInfo", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32))
+c_GetOutMessageInfo         = _LazyFunction("simxGetOutMessageInfo", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32))
+c_GetConnectionId           = _LazyFunction("simxGetConnectionId", ct.c_int32,ct.c_int32)
+c_CreateBuffer              = _LazyFunction("simxCreateBuffer", ct.POINTER(ct.c_ubyte), ct.c_int32)
+c_ReleaseBuffer             = _LazyFunction("simxReleaseBuffer", None, ct.c_void_p)
+c_TransferFile              = _LazyFunction("simxTransferFile", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_char), ct.c_int32, ct.c_int32)
+c_EraseFile                 = _LazyFunction("simxEraseFile", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.c_int32)
+c_GetAndClearStringSignal   = _LazyFunction("simxGetAndClearStringSignal", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.POINTER(ct.c_ubyte)), ct.POINTER(ct.c_int32), ct.c_int32)
+c_ReadStringStream          = _LazyFunction("simxReadStringStream", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.POINTER(ct.c_ubyte)), ct.POINTER(ct.c_int32), ct.c_int32)
+c_CreateDummy               = _LazyFunction("simxCreateDummy", ct.c_int32,ct.c_int32, ct.c_float, ct.POINTER(ct.c_ubyte), ct.POINTER(ct.c_int32), ct.c_int32)
+c_Query                     = _LazyFunction("simxQuery", ct.c_int32,ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.c_ubyte), ct.c_int32, ct.POINTER(ct.c_char), ct.POINTER(ct.POINTER(ct.c_ubyte)), ct.POINTER(ct.c_int32), ct.c_int32)
+c_GetObjectGroupData        = _LazyFunction("simxGetObjectGroupData", ct.c_int32,ct.c_int32, ct.c_int32, ct.c_int32, ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_int32)), ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_int32)), ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_float)), ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_char)), ct.c_int32)
+c_GetObjectVelocity         = _LazyFunction("simxGetObjectVelocity", ct.c_int32,ct.c_int32, ct.c_int32, ct.POINTER(ct.c_float), ct.POINTER(ct.c_float), ct.c_int32)
+c_CallScriptFunction        = _LazyFunction("simxCallScriptFunction", ct.c_int32,ct.c_int32,ct.POINTER(ct.c_char),ct.c_int32,ct.POINTER(ct.c_char),ct.c_int32,ct.POINTER(ct.c_int32),ct.c_int32,ct.POINTER(ct.c_float),ct.c_int32,ct.POINTER(ct.c_char),ct.c_int32,ct.POINTER(ct.c_ubyte),ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_int32)),ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_float)),ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_char)),ct.POINTER(ct.c_int32), ct.POINTER(ct.POINTER(ct.c_ubyte)),ct.c_int32)
 
 #API functions
 def simxGetJointPosition(clientID, jointHandle, operationMode):
@@ -301,6 +321,35 @@ def simxGetVisionSensorImage(clientID, sensorHandle, options, operationMode):
             reso.append(resolution[i])
     return ret, reso, image
 
+def simxGetVisionSensorImageNumpy(clientID, sensorHandle, options, operationMode):
+    '''
+    Same as simxGetVisionSensorImage, but the image is copied out of the C buffer with a single memmove
+    and returned as a uint8 numpy array of shape (H, W, 3), or (H, W) in grayscale mode (options bit 0).
+    The rows are flipped (as a view) so that the first row is the top of the image.
+    '''
+    import numpy as np
+
+    resolution = (ct.c_int*2)()
+    c_image  = ct.POINTER(ct.c_byte)()
+    bytesPerPixel = 3
+    if (options & 1) != 0:
+        bytesPerPixel = 1
+    ret = c_GetVisionSensorImage(clientID, sensorHandle, resolution, ct.byref(c_image), options, operationMode)
+
+    reso = []
+    image = None
+    if (ret == 0):
+        reso = [resolution[0], resolution[1]]
+        size = resolution[0] * resolution[1] * bytesPerPixel
+        image = np.empty(size, dtype=np.uint8)
+        ct.memmove(image.ctypes.data, c_image, size)
+        if bytesPerPixel == 3:
+            image = image.reshape((resolution[1], resolution[0], 3))
+        else:
+            image = image.reshape((resolution[1], resolution[0]))
+        image = image[::-1]
+    return ret, reso, image
+
 def simxSetVisionSensorImage(clientID, sensorHandle, image, options, operationMode):
     '''
     Please have a look at the function description/documentation in the CoppeliaSim user manual
@@ -1363,48 +1412,66 @@ def simxGetObjectGroupData(clientID, objectType, dataType, operationMode):
 
     return ret, handles, intData, floatData, stringData
 
-def simxCallScriptFunction(clientID, scriptDescription, options, functionName, inputInts, inputFloats, inputStrings, inputBuffer, operationMode):
+def _to_c_array(values, c_type, typecode):
     '''
-    Please have a look at the function description/documentation in the CoppeliaSim user manual
+    Copy a list, array.array or numpy array into a ctypes array of c_type with one bulk copy when possible.
     '''
+    try:
+        view = memoryview(values)
+    except TypeError:
+        view = None
+    if view is None or view.format != typecode or not view.c_contiguous:
+        view = memoryview(array.array(typecode, values))
+    return (c_type*(view.nbytes//ct.sizeof(c_type))).from_buffer_copy(view)
 
-    inputBufferV=inputBuffer
-    if sys.version_info[0] == 3:
-        if type(scriptDescription) is str:
-            scriptDescription=scriptDescription.encode('utf-8')
-        if type(functionName) is str:
-            functionName=functionName.encode('utf-8')
-        if type(inputBuffer) is bytearray:
-            inputBufferV  = (ct.c_ubyte*len(inputBuffer))(*inputBuffer)
-        if type(inputBuffer) is str:
-            inputBuffer=inputBuffer.encode('utf-8')
-            inputBufferV  = (ct.c_ubyte*len(inputBuffer))(*inputBuffer)
-    else:
-        if type(inputBuffer) is bytearray:
-            inputBufferV = (ct.c_ubyte*len(inputBuffer))(*inputBuffer)
-        if type(inputBuffer) is str:
-            inputBuffer=bytearray(inputBuffer)
-            inputBufferV = (ct.c_ubyte*len(inputBuffer))(*inputBuffer)
-    inputBufferV=ct.cast(inputBufferV,ct.POINTER(ct.c_ubyte)) # IronPython needs this
-
-    c_inInts  = (ct.c_int*len(inputInts))(*inputInts)
-    c_inInts = ct.cast(c_inInts,ct.POINTER(ct.c_int)) # IronPython needs this
-    c_inFloats  = (ct.c_float*len(inputFloats))(*inputFloats)
-    c_inFloats = ct.cast(c_inFloats,ct.POINTER(ct.c_float)) # IronPython needs this
-
-    concatStr=''.encode('utf-8')
-    for i in range(len(inputStrings)):
-        a=inputStrings[i]
-        a=a+'\0'
+def _to_c_buffer(buffer):
+    '''
+    Copy a str, bytes, bytearray, array.array or numpy array into a ctypes ubyte array with one bulk copy.
+    '''
+    if type(buffer) is str:
+        buffer=buffer.encode('utf-8')
+    if type(buffer) is bytearray:
+        return (ct.c_ubyte*len(buffer)).from_buffer(buffer)
+    view = memoryview(buffer).cast('B')
+    return (ct.c_ubyte*len(view)).from_buffer_copy(view)
+
+def _concat_strings(strings):
+    '''
+    Join input strings into the null-separated block expected by the remote API.
+    '''
+    parts = []
+    for a in strings:
         if type(a) is str:
             a=a.encode('utf-8')
-        concatStr=concatStr+a
-    c_inStrings  = (ct.c_char*len(concatStr))(*concatStr)
+        parts.append(a)
+        parts.append(b'\0')
+    return b''.join(parts)
 
-    intDataOut =[]
-    floatDataOut =[]
-    stringDataOut =[]
-    bufferOut =bytearray()
+def _split_strings(stringP, count):
+    '''
+    Read count null-terminated strings laid out back to back starting at stringP.
+    '''
+    strings = []
+    address = ct.cast(stringP, ct.c_void_p).value
+    for i in range(count):
+        a = ct.string_at(address)
+        address += len(a) + 1
+        strings.append(str(a, 'utf-8'))
+    return strings
+
+def _call_script_function(clientID, scriptDescription, options, functionName, inputInts, inputFloats, inputStrings, inputBuffer, operationMode):
+    '''
+    Marshal the inputs in bulk, call the script function and return the raw output pointers and counts.
+    '''
+    if type(scriptDescription) is str:
+        scriptDescription=scriptDescription.encode('utf-8')
+    if type(functionName) is str:
+        functionName=functionName.encode('utf-8')
+    inputBufferV = _to_c_buffer(inputBuffer)
+    c_inInts = _to_c_array(inputInts, ct.c_int, 'i')
+    c_inFloats = _to_c_array(inputFloats, ct.c_float, 'f')
+    concatStr = _concat_strings(inputStrings)
+    c_inStrings = ct.create_string_buffer(concatStr, len(concatStr))
 
     intDataC = ct.c_int()
     intDataP = ct.POINTER(ct.c_int)()
@@ -1415,32 +1482,56 @@ def simxCallScriptFunction(clientID, scriptDescription, options, functionName, i
     bufferS = ct.c_int()
     bufferP = ct.POINTER(ct.c_ubyte)()
 
-    ret = c_CallScriptFunction(clientID,scriptDescription,options,functionName,len(inputInts),c_inInts,len(inputFloats),c_inFloats,len(inputStrings),c_inStrings,len(inputBuffer),inputBufferV,ct.byref(intDataC),ct.byref(intDataP),ct.byref(floatDataC),ct.byref(floatDataP),ct.byref(stringDataC),ct.byref(stringDataP),ct.byref(bufferS),ct.byref(bufferP),operationMode)
+    ret = c_CallScriptFunction(clientID,scriptDescription,options,functionName,len(c_inInts),ct.cast(c_inInts,ct.POINTER(ct.c_int)),len(c_inFloats),ct.cast(c_inFloats,ct.POINTER(ct.c_float)),len(inputStrings),ct.cast(c_inStrings,ct.POINTER(ct.c_char)),len(inputBufferV),ct.cast(inputBufferV,ct.POINTER(ct.c_ubyte)),ct.byref(intDataC),ct.byref(intDataP),ct.byref(floatDataC),ct.byref(floatDataP),ct.byref(stringDataC),ct.byref(stringDataP),ct.byref(bufferS),ct.byref(bufferP),operationMode)
+
+    return ret, (intDataP, intDataC.value), (floatDataP, floatDataC.value), (stringDataP, stringDataC.value), (bufferP, bufferS.value)
+
+def _from_c_array(pointer, count, itemsize, typecode):
+    out = array.array(typecode)
+    if count > 0:
+        out.frombytes(ct.string_at(pointer, count*itemsize))
+    return out
+
+def simxCallScriptFunction(clientID, scriptDescription, options, functionName, inputInts, inputFloats, inputStrings, inputBuffer, operationMode):
+    '''
+    Please have a look at the function description/documentation in the CoppeliaSim user manual
+    '''
+
+    ret, ints, floats, strings, buffer = _call_script_function(clientID, scriptDescription, options, functionName, inputInts, inputFloats, inputStrings, inputBuffer, operationMode)
+
+    intDataOut =[]
+    floatDataOut =[]
+    stringDataOut =[]
+    bufferOut =bytearray()
+    if ret == 0:
+        intDataOut = _from_c_array(ints[0], ints[1], 4, 'i').tolist()
+        floatDataOut = _from_c_array(floats[0], floats[1], 4, 'f').tolist()
+        stringDataOut = _split_strings(strings[0], strings[1])
+        if buffer[1] > 0:
+            bufferOut = bytearray(ct.string_at(buffer[0], buffer[1]))
+
+    return ret, intDataOut, floatDataOut, stringDataOut, bufferOut
 
+def simxCallScriptFunctionArrays(clientID, scriptDescription, options, functionName, inputInts, inputFloats, inputStrings, inputBuffer, operationMode):
+    '''
+    Same as simxCallScriptFunction, for large payloads. Inputs may be lists, array.array or numpy arrays
+    (int32/float32 contiguous arrays are copied in bulk). The int and float outputs are returned as
+    array.array('i') and array.array('f'), and the buffer output as bytes, so that they can be wrapped
+    with numpy.frombuffer without another copy.
+    '''
+
+    ret, ints, floats, strings, buffer = _call_script_function(clientID, scriptDescription, options, functionName, inputInts, inputFloats, inputStrings, inputBuffer, operationMode)
+
+    intDataOut = array.array('i')
+    floatDataOut = array.array('f')
+    stringDataOut = []
+    bufferOut = b''
     if ret == 0:
-        for i in range(intDataC.value):
-            intDataOut.append(intDataP[i])
-        for i in range(floatDataC.value):
-            floatDataOut.append(floatDataP[i])
-        s = 0
-        for i in range(stringDataC.value):
-            a = bytearray()
-            while stringDataP[s] != b'\0':
-                if sys.version_info[0] == 3:
-                    a.append(int.from_bytes(stringDataP[s],'big'))
-                else:
-                    a.append(stringDataP[s])
-                s += 1
-            s += 1 #skip null
-            if sys.version_info[0] == 3:
-                a=str(a,'utf-8')
-            else:
-                a=str(a)
-            stringDataOut.append(a)
-        for i in range(bufferS.value):
-            bufferOut.append(bufferP[i])
-    if sys.version_info[0] != 3:
-        bufferOut=str(bufferOut)
+        intDataOut = _from_c_array(ints[0], ints[1], 4, 'i')
+        floatDataOut = _from_c_array(floats[0], floats[1], 4, 'f')
+        stringDataOut = _split_strings(strings[0], strings[1])
+        if buffer[1] > 0:
+            bufferOut = ct.string_at(buffer[0], buffer[1])
 
     return ret, intDataOut, floatDataOut, stringDataOut, bufferOut
 
@@ -1459,52 +1550,77 @@ def simxGetObjectVelocity(clientID, objectHandle, operationMode):
         arr2.append(angularVel[i])
     return ret, arr1, arr2
 
+def _pack_array(values, typecode):
+    try:
+        view = memoryview(values)
+    except TypeError:
+        view = None
+    if view is not None and view.format == typecode and view.c_contiguous:
+        a = array.array(typecode)
+        a.frombytes(view.cast('B'))
+    else:
+        a = array.array(typecode, values)
+    if sys.byteorder != 'little':
+        a.byteswap()
+    return bytearray(a.tobytes())
+
+def _unpack_array(packed, typecode, asArray):
+    a = array.array(typecode)
+    a.frombytes(bytes(packed[:len(packed) - len(packed) % a.itemsize]))
+    if sys.byteorder != 'little':
+        a.byteswap()
+    if asArray:
+        return a
+    return a.tolist()
+
 def simxPackInts(intList):
     '''
     Please have a look at the function description/documentation in the CoppeliaSim user manual
     '''
 
-    if sys.version_info[0] == 3:
-        s=bytes()
-        for i in range(len(intList)):
-            s=s+struct.pack('<i',intList[i])
-        s=bytearray(s)
-    else:
-        s=''
-        for i in range(len(intList)):
-            s+=struct.pack('<i',intList[i])
-    return s
+    return _pack_array(intList, 'i')
 
-def simxUnpackInts(intsPackedInString):
+def simxUnpackInts(intsPackedInString, asArray=False):
     '''
     Please have a look at the function description/documentation in the CoppeliaSim user manual
+    If asArray is True, an array.array('i') is returned instead of a list.
     '''
-    b=[]
-    for i in range(int(len(intsPackedInString)/4)):
-        b.append(struct.unpack('<i',intsPackedInString[4*i:4*(i+1)])[0])
-    return b
+
+    return _unpack_array(intsPackedInString, 'i', asArray)
 
 def simxPackFloats(floatList):
     '''
     Please have a look at the function description/documentation in the CoppeliaSim user manual
     '''
 
-    if sys.version_info[0] == 3:
-        s=bytes()
-        for i in range(len(floatList)):
-            s=s+struct.pack('<f',floatList[i])
-        s=bytearray(s)
-    else:
-        s=''
-        for i in range(len(floatList)):
-            s+=struct.pack('<f',floatList[i])
-    return s
+    return _pack_array(floatList, 'f')
 
-def simxUnpackFloats(floatsPackedInString):
+def simxUnpackFloats(floatsPackedInString, asArray=False):
     '''
     Please have a look at the function description/documentation in the CoppeliaSim user manual
+    If asArray is True, an array.array('f') is returned instead of a list.
+    '''
+
+    return _unpack_array(floatsPackedInString, 'f', asArray)
+
+def simxPackRecords(recordFormat, records):
+    '''
+    Pack a sequence of records (tuples) with the struct format recordFormat, e.g. 'iifff', little-endian.
+    The result can be passed as the inputBuffer of simxCallScriptFunction and read in Lua with
+    sim.unpackInt32Table/sim.unpackFloatTable or string.unpack.
     '''
-    b=[]
-    for i in range(int(len(floatsPackedInString)/4)):
-        b.append(struct.unpack('<f',floatsPackedInString[4*i:4*(i+1)])[0])
-    return b
+
+    record = struct.Struct('<' + recordFormat)
+    out = bytearray(record.size * len(records))
+    for i, r in enumerate(records):
+        record.pack_into(out, i * record.size, *r)
+    return out
+
+def simxUnpackRecords(recordFormat, recordsPackedInString):
+    '''
+    Unpack a buffer produced by simxPackRecords (or by the simulator with the same layout) into a list of tuples.
+    '''
+
+    record = struct.Struct('<' + recordFormat)
+    size = len(recordsPackedInString) - len(recordsPackedInString) % record.size
+    return list(record.iter_unpack(memoryview(bytes(recordsPackedInString[:size]))))
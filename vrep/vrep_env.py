@@ -1,24 +1,151 @@
 from vrep import sim
 import numpy as np
+import contextlib
+import hashlib
+import json
+import os
 
 BLOCKING = sim.simx_opmode_blocking
+ONESHOT = sim.simx_opmode_oneshot
+STREAMING = sim.simx_opmode_streaming
+BUFFER = sim.simx_opmode_buffer
+DISCONTINUE = sim.simx_opmode_discontinue
 
 
-class VrepEnv:
-    def __init__(self,
-                 server_addr='127.0.0.1',
-                 server_port=19997,
-                 scene_path=None,
-                 cid=-1):
+def _read_vision_image(cid, handle, relativeToObjectHandle, mode):
+    ret, _, image = sim.simxGetVisionSensorImageNumpy(cid, handle, 0, mode)
+    return ret, image
+
+
+# Data kinds that can be subscribed to with `VrepEnv.subscribe`.
+# Every reader is called as reader(cid, handle, relativeToObjectHandle, operationMode) -> (ret, value).
+STREAM_READERS = {
+    'position': lambda cid, handle, rel, mode: sim.simxGetObjectPosition(cid, handle, rel, mode),
+    'orientation': lambda cid, handle, rel, mode: sim.simxGetObjectOrientation(cid, handle, rel, mode),
+    'joint_angle': lambda cid, handle, rel, mode: sim.simxGetJointPosition(cid, handle, mode),
+    'vision_image': _read_vision_image,
+}
+
+def scene_hash(scene_path):
+    """SHA-1 of a `.ttt` scene file, used to key its handle manifest."""
+
+    sha1 = hashlib.sha1()
+    with open(scene_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+class SimSession(object):
+    """A connection to V-Rep, shared by every `VrepEnv` attached to it.
+
+    The session owns the connection id, the simulation run state, the object handle cache,
+    the streaming subscriptions and the batch state, so attaching a component costs no network traffic.
+    """
+
+    def __init__(self, server_addr='127.0.0.1', server_port=19997, cid=-1):
+        """
+        :param server_addr: Address which is used to connect python and V-Rep.
+        :param server_port: Port which is used to connect python and V-Rep.
+        :param cid: Id of an already opened connection. A new connection is opened when it is -1.
+        """
 
-        self.sim_running = False
         if cid == -1:
             self.cid = sim.simxStart(server_addr, server_port, True, True, 5000, 5)
         else:
             self.cid = cid
-            self.sim_running = True
+        self.server_addr = server_addr
+        self.server_port = server_port
+        self.scene_path = None
+        self.sim_running = False
+        self.handle_cache = {}
+        self.handle_cache_stats = {'hits': 0, 'misses': 0}
+        self.subscriptions = {}
+        self.batch_depth = 0
+
+    def load_scene(self, scene_path):
+        """Load a scene in V-Rep and drop every handle cached for the previous one."""
 
         sim.simxLoadScene(self.cid, scene_path, -1, BLOCKING)
+        self.scene_path = scene_path
+        self.handle_cache.clear()
+        self.subscriptions.clear()
+
+
+class VrepEnv:
+    def __init__(self,
+                 server_addr='127.0.0.1',
+                 server_port=19997,
+                 scene_path=None,
+                 cid=-1,
+                 session=None):
+        """
+        :param server_addr: Address which is used to connect python and V-Rep.
+        :param server_port: Port which is used to connect python and V-Rep.
+        :param scene_path: Scene to load. Nothing is loaded when it is `None`.
+        :param cid: Id of an already opened connection, used when no `session` is given.
+        :param session: `SimSession` to attach to. A new one is created when it is `None`.
+        """
+
+        if session is None:
+            session = SimSession(server_addr, server_port, cid)
+        self.session = session
+        self.cid = session.cid
+
+        if scene_path is not None:
+            self.session.load_scene(scene_path)
+            self.resolve_scene_handles(scene_path)
+
+    @property
+    def sim_running(self):
+        return self.session.sim_running
+
+    @sim_running.setter
+    def sim_running(self, running):
+        self.session.sim_running = running
+
+    @contextlib.contextmanager
+    def batch(self, confirm=False):
+        """Queue the setters issued inside the block and deliver them to V-Rep in one message.
+
+        :param confirm: Wait until V-Rep has processed the batch before returning.
+        :type confirm: bool
+
+        Setters are sent with `simx_opmode_oneshot` between `simxPauseCommunication(1)` and
+        `simxPauseCommunication(0)`. Calls that need a reply (getters, script calls) still work inside
+        a batch: the queue is sent first. Batches can be nested; only the outermost one flushes.
+        """
+
+        depth = self.session.batch_depth
+        if depth == 0:
+            sim.simxPauseCommunication(self.cid, 1)
+        self.session.batch_depth = depth + 1
+        try:
+            yield self
+        finally:
+            self.session.batch_depth = depth
+            if depth == 0:
+                sim.simxPauseCommunication(self.cid, 0)
+        if confirm and depth == 0:
+            sim.simxGetPingTime(self.cid)
+
+    def _send(self, func, *args):
+        """Call a setter `func(*args, operationMode)`, queued with `oneshot` inside a batch, blocking otherwise."""
+
+        if self.session.batch_depth:
+            return func(*(args + (ONESHOT,)))
+        return func(*(args + (BLOCKING,)))
+
+    def _blocking(self, func, *args):
+        """Call `func(*args, BLOCKING)`. Inside a batch, communication is resumed for the call."""
+
+        if not self.session.batch_depth:
+            return func(*(args + (BLOCKING,)))
+        sim.simxPauseCommunication(self.cid, 0)
+        try:
+            return func(*(args + (BLOCKING,)))
+        finally:
+            sim.simxPauseCommunication(self.cid, 1)
 
     def start_simulation(self):
         if self.sim_running:
@@ -35,42 +162,204 @@ class VrepEnv:
     def step_simulation(self):
         sim.simxSynchronousTrigger(self.cid)
 
+    def set_boolean_parameter(self, param, value):
+        self._send(sim.simxSetBooleanParameter, self.cid, param, value)
+
     def get_object_handle(self, name):
-        _, handle = sim.simxGetObjectHandle(self.cid, name, BLOCKING)
+        cache = self.session.handle_cache
+        stats = self.session.handle_cache_stats
+        if name in cache:
+            stats['hits'] += 1
+            return cache[name]
+        stats['misses'] += 1
+        ret, handle = self._blocking(sim.simxGetObjectHandle, self.cid, name)
+        if ret == sim.simx_return_ok:
+            cache[name] = handle
         return handle
 
+    def resolve_scene_handles(self, scene_path, manifest_dir=None):
+        """Resolve the handles of every object of the loaded scene at once and put them in the handle cache.
+
+        :param scene_path: Path of the loaded `.ttt` file.
+        :param manifest_dir: Directory of the handle manifests. Defaults to `.handle_manifests` next to the scene.
+        :return: handles
+
+        `handles` is a dict from object name to handle. It is fetched with one `simxGetObjectGroupData` call
+        and persisted to `<manifest_dir>/<scene_hash>.json`. When that manifest already exists, a single
+        handle is checked against V-Rep instead.
+        """
+
+        if manifest_dir is None:
+            manifest_dir = os.path.join(os.path.dirname(os.path.abspath(scene_path)), '.handle_manifests')
+        try:
+            manifest_path = os.path.join(manifest_dir, scene_hash(scene_path) + '.json')
+        except (IOError, OSError):
+            manifest_path = None
+
+        handles = None
+        if manifest_path is not None and os.path.exists(manifest_path):
+            try:
+                with open(manifest_path) as f:
+                    handles = json.load(f)
+            except (IOError, OSError, ValueError):
+                handles = None
+            if handles:
+                name = sorted(handles)[0]
+                ret, handle = self._blocking(sim.simxGetObjectHandle, self.cid, name)
+                if ret != sim.simx_return_ok or handle != handles[name]:
+                    handles = None
+
+        if handles is None:
+            ret, object_handles, _, _, names = self._blocking(sim.simxGetObjectGroupData, self.cid, sim.sim_handle_all, 0)
+            if ret != sim.simx_return_ok:
+                return {}
+            handles = dict(zip(names, object_handles))
+            if manifest_path is not None:
+                # written aside and moved into place, as workers loading the same scene may read it meanwhile
+                temp_path = '{}.{}.tmp'.format(manifest_path, os.getpid())
+                try:
+                    os.makedirs(manifest_dir, exist_ok=True)
+                    with open(temp_path, 'w') as f:
+                        json.dump(handles, f)
+                    os.replace(temp_path, manifest_path)
+                except (IOError, OSError):
+                    pass
+
+        self.session.handle_cache.update(handles)
+        return handles
+
+    def invalidate_handles(self, handles=None):
+        """Drop cached object handles of the session.
+
+        :param handles: Handles to drop. All cached handles are dropped when `None`.
+        :type handles: list.
+        """
+
+        cache = self.session.handle_cache
+        if handles is None:
+            cache.clear()
+            return
+        for name in [n for n, h in cache.items() if h in handles]:
+            del cache[name]
+
+    def handle_cache_stats(self):
+        """Return the handle cache counters of the session, as a dict with 'hits', 'misses' and 'size'."""
+
+        stats = dict(self.session.handle_cache_stats)
+        stats['size'] = len(self.session.handle_cache)
+        return stats
+
+    def remove_object(self, handle):
+        """Remove an object from the scene through `RemotePyApi` and drop its cached handle."""
+
+        self.invalidate_handles([handle])
+        self.call_childscript_function('RemotePyApi', 'pyRemoveObj', [[handle], [], [], bytearray()])
+
     def obj_get_position(self, handle, relativeToObjectHandle=-1):
-        _, pos = sim.simxGetObjectPosition(self.cid, handle, relativeToObjectHandle, BLOCKING)
+        _, pos = self._blocking(sim.simxGetObjectPosition, self.cid, handle, relativeToObjectHandle)
         return pos
 
     def obj_set_position(self, handle, position, relativeToObjectHandle=-1):
-        sim.simxSetObjectPosition(self.cid, handle, relativeToObjectHandle, position, BLOCKING)
+        self._send(sim.simxSetObjectPosition, self.cid, handle, relativeToObjectHandle, position)
 
     def obj_get_orientation(self, handle, relativeToObjectHandle=-1):
-        _, ori = sim.simxGetObjectOrientation(self.cid, handle, relativeToObjectHandle, BLOCKING)
+        _, ori = self._blocking(sim.simxGetObjectOrientation, self.cid, handle, relativeToObjectHandle)
         return ori
 
     def obj_set_orientation(self, handle, orientation, relativeToObjectHandle=-1):
-        sim.simxSetObjectOrientation(self.cid, handle, relativeToObjectHandle, orientation, BLOCKING)
+        self._send(sim.simxSetObjectOrientation, self.cid, handle, relativeToObjectHandle, orientation)
 
-    def call_childscript_function(self, script_name, func_name, inData):
-        outData = sim.simxCallScriptFunction(self.cid, script_name, 1, func_name, inData[0], inData[1], inData[2], inData[3], BLOCKING)
+    def call_childscript_function(self, script_name, func_name, inData, wait=True):
+        """Call a function of a child script. With `wait=False` the call is treated as a setter:
+        it is queued inside a batch and nothing is returned."""
+        if not wait:
+            self._send(sim.simxCallScriptFunction, self.cid, script_name, 1, func_name, inData[0], inData[1], inData[2], inData[3])
+            return None
+        outData = self._blocking(sim.simxCallScriptFunction, self.cid, script_name, 1, func_name, inData[0], inData[1], inData[2], inData[3])
         return outData
 
-    def obj_get_vision_image(self, handle):
-        _, resolution, image = sim.simxGetVisionSensorImage(self.cid, handle, 0, BLOCKING)
-        dim, im = resolution, image
-        nim = np.array(im, dtype='uint8')
-        nim = np.reshape(nim, (dim[1], dim[0], 3))
-        nim = np.flip(nim, 0)  # horizontal flip
-        return nim
+    def call_childscript_function_arrays(self, script_name, func_name, inData):
+        """Same as `call_childscript_function`, but marshals array.array / numpy payloads in bulk
+        and returns the int and float outputs as array.array."""
+        outData = self._blocking(sim.simxCallScriptFunctionArrays, self.cid, script_name, 1, func_name, inData[0], inData[1], inData[2], inData[3])
+        return outData
+
+    def obj_get_vision_image(self, handle, grayscale=False):
+        """Return the image of a vision sensor, (H, W, 3), or (H, W) when `grayscale`."""
+        _, resolution, image = self._blocking(sim.simxGetVisionSensorImageNumpy, self.cid, handle, int(grayscale))
+        return image
+
+    def obj_get_vision_resolution(self, handle):
+        _, x = self._blocking(sim.simxGetObjectIntParameter, self.cid, handle, sim.sim_visionintparam_resolution_x)
+        _, y = self._blocking(sim.simxGetObjectIntParameter, self.cid, handle, sim.sim_visionintparam_resolution_y)
+        return [x, y]
+
+    def obj_set_vision_resolution(self, handle, resolution):
+        self._send(sim.simxSetObjectIntParameter, self.cid, handle, sim.sim_visionintparam_resolution_x, resolution[0])
+        self._send(sim.simxSetObjectIntParameter, self.cid, handle, sim.sim_visionintparam_resolution_y, resolution[1])
 
     def obj_get_joint_angle(self, handle):
-        _, angle = sim.simxGetJointPosition(self.cid, handle, BLOCKING)
+        _, angle = self._blocking(sim.simxGetJointPosition, self.cid, handle)
         return angle
 
     def obj_set_position_target(self, handle, angle):
-        sim.simxSetJointTargetPosition(self.cid, handle, -np.deg2rad(angle), BLOCKING)
+        self._send(sim.simxSetJointTargetPosition, self.cid, handle, -np.deg2rad(angle))
+
+    def subscribe(self, kind, handle, relativeToObjectHandle=-1):
+        """Start streaming `kind` (a key of `STREAM_READERS`) for `handle`. Subscribing twice is a no-op.
+
+        :return: The subscription key.
+        """
+
+        key = (kind, handle, relativeToObjectHandle)
+        if key not in self.session.subscriptions:
+            STREAM_READERS[kind](self.cid, handle, relativeToObjectHandle, STREAMING)
+            self.session.subscriptions[key] = {'value': None, 'timestamp': None, 'misses': 0}
+        return key
+
+    def unsubscribe(self, kind, handle, relativeToObjectHandle=-1):
+        """Stop streaming `kind` for `handle`."""
+
+        key = (kind, handle, relativeToObjectHandle)
+        if self.session.subscriptions.pop(key, None) is not None:
+            STREAM_READERS[kind](self.cid, handle, relativeToObjectHandle, DISCONTINUE)
+
+    def read_subscribed(self, kind, handle, relativeToObjectHandle=-1, max_age=None):
+        """Read a streamed value from the local buffer, without a round trip.
+
+        :param max_age: Maximum age (ms of simulation time) of the value. `None` accepts any buffered value.
+        :type max_age: int value.
+        :return: value, timestamp
+
+        `timestamp` is the simulation time (ms) of the message the value arrived with.
+        A blocking read is made instead when nothing was received yet, or when the value is older than `max_age`.
+
+        The buffer keeps returning the last received value once the stream stops, and the legacy API gives no
+        time per command, so a buffered value is dated by the last message time at which it changed.
+        A value that stays the same is thus refreshed with a blocking read every `max_age`. When that read fails,
+        the previous value and timestamp are returned, (None, None) if there is none, and the miss is counted.
+        """
+
+        key = self.subscribe(kind, handle, relativeToObjectHandle)
+        sub = self.session.subscriptions[key]
+        reader = STREAM_READERS[kind]
+        ret, value = reader(self.cid, handle, relativeToObjectHandle, BUFFER)
+        if ret == sim.simx_return_ok:
+            if sub['value'] is None or not np.array_equal(value, sub['value']):
+                sub['value'], sub['timestamp'] = value, sim.simxGetLastCmdTime(self.cid)
+        else:
+            sub['misses'] += 1
+
+        stale = sub['value'] is None
+        if not stale and max_age is not None:
+            stale = sim.simxGetLastCmdTime(self.cid) - sub['timestamp'] > max_age
+        if stale:
+            ret, value = self._blocking(reader, self.cid, handle, relativeToObjectHandle)
+            if ret == sim.simx_return_ok:
+                sub['value'], sub['timestamp'] = value, sim.simxGetLastCmdTime(self.cid)
+            else:
+                sub['misses'] += 1
+        return sub['value'], sub['timestamp']
 
     def get_path(self, points_num=30):
         emptyBuff = bytearray()